@@ -5,8 +5,13 @@ Simple username/password authentication for user accounts.
 No email verification - just signup and login.
 """
 
-import json
+import asyncio
+from typing import Iterator
+
+import orjson
+from cachetools import TTLCache
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from app.models.user import (
     UserSignup, UserLogin, UserPreferences,
@@ -16,20 +21,23 @@ from app.db.database import get_database
 
 router = APIRouter()
 
+# (user_id, book_id) pairs recently added in this process. Lets duplicate
+# "add" clicks return without touching the DB; cleared on remove.
+_recent_reading_list_adds: TTLCache = TTLCache(maxsize=100_000, ttl=300)
+
+# Book fields returned for reading-list entries (same keys as _book_to_dict)
+_BOOK_COLUMNS = ("id", "title", "author", "description", "genre", "rating", "cover_url")
+
 
 def _user_to_response(user_dict: dict) -> UserResponse:
     """Convert database user dict to response model."""
-    genres = user_dict.get("favorite_genres", "[]")
-    if isinstance(genres, str):
-        genres = json.loads(genres)
-    
     return UserResponse(
         id=user_dict["id"],
         username=user_dict["username"],
         display_name=user_dict.get("display_name") or user_dict["username"],
         theme=user_dict.get("theme", "dark"),
         personality=user_dict.get("personality", "friendly"),
-        favorite_genres=genres
+        favorite_genres=user_dict.get("favorite_genres", [])
     )
 
 
@@ -42,7 +50,9 @@ async def signup(request: UserSignup) -> AuthResponse:
     """
     db = get_database()
     
-    user_id = db.create_user(
+    # Password hashing (scrypt) is CPU-bound; keep it off the event loop
+    user_id = await asyncio.to_thread(
+        db.create_user,
         username=request.username,
         password=request.password,
         display_name=request.display_name
@@ -71,7 +81,7 @@ async def login(request: UserLogin) -> AuthResponse:
     """
     db = get_database()
     
-    user = db.authenticate_user(request.username, request.password)
+    user = await asyncio.to_thread(db.authenticate_user, request.username, request.password)
     
     if user is None:
         return AuthResponse(
@@ -103,18 +113,15 @@ async def update_preferences(user_id: int, preferences: UserPreferences) -> User
     """Update user preferences (theme, personality, genres)."""
     db = get_database()
     
-    user = db.get_user(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    db.update_user_preferences(
+    updated_user = db.update_user_preferences(
         user_id=user_id,
         theme=preferences.theme,
         personality=preferences.personality,
         favorite_genres=preferences.favorite_genres
     )
+    if not updated_user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    updated_user = db.get_user(user_id)
     return _user_to_response(updated_user)
 
 
@@ -135,34 +142,48 @@ class ReadingListResponse(BaseModel):
 @router.post("/user/{user_id}/reading-list", response_model=ReadingListResponse)
 async def add_to_reading_list(user_id: int, request: ReadingListRequest) -> ReadingListResponse:
     """Add a book to user's reading list."""
-    db = get_database()
-    
-    user = db.get_user(user_id)
-    if not user:
-        return ReadingListResponse(success=False, message="User not found")
-    
-    # Check if already in list
-    if db.is_in_reading_list(user_id, request.book_id):
+    key = (user_id, str(request.book_id))
+    if key in _recent_reading_list_adds:
         return ReadingListResponse(
             success=False, 
             message="Book already in your reading list"
         )
     
-    # Add to reading_list table
-    db.add_to_reading_list(user_id, request.book_id)
+    db = get_database()
+    
+    # Single guarded INSERT: succeeds only for an existing user and a new book
+    if db.add_to_reading_list(user_id, request.book_id):
+        _recent_reading_list_adds[key] = True
+        return ReadingListResponse(
+            success=True,
+            message="Book added to reading list!"
+        )
+    
+    # Slow path (rare): figure out why nothing was inserted
+    if not db.get_user(user_id):
+        return ReadingListResponse(success=False, message="User not found")
     
     return ReadingListResponse(
-        success=True,
-        message="Book added to reading list!"
+        success=False, 
+        message="Book already in your reading list"
     )
 
 
-@router.get("/user/{user_id}/reading-list", response_model=ReadingListResponse)
+@router.get(
+    "/user/{user_id}/reading-list",
+    responses={200: {"model": ReadingListResponse}}
+)
 async def get_reading_list(
     request: Request,
     user_id: int
-) -> ReadingListResponse:
-    """Get user's reading list with full book details from Vector Store."""
+):
+    """
+    Get user's reading list with full book details from Vector Store.
+    
+    The body has the ReadingListResponse shape but is streamed: the rows
+    are fetched up front, then each book is resolved and serialized one
+    at a time, so the full JSON document is never built in memory.
+    """
     from app.api.v1.endpoints.discover import _book_to_dict
     
     db = get_database()
@@ -171,50 +192,31 @@ async def get_reading_list(
     if not user:
         return ReadingListResponse(success=False, message="User not found")
     
-    # 1. Get List of Book IDs from DB
-    conn = db._get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT book_id, added_at FROM reading_list WHERE user_id = ? ORDER BY added_at DESC", 
-        (user_id,)
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    
-    book_ids = [row["book_id"] for row in rows]
+    # 1. Reading list joined with the DB book cache - one round-trip
+    rows = db.get_reading_list(user_id)
     
-    # 2. Resolve to full books from Vector Store (Source of Truth for Covers)
+    # 2. Resolve from Vector Store first (Source of Truth for Covers);
+    #    the str-ID index makes each lookup an exact O(1) probe.
     vector_store = request.app.state.vector_store
-    full_books = []
-    
-    for bib in book_ids:
-        # Try finding by string ID or int ID
-        book = None
-        if bib in vector_store._books:
-            book = vector_store._books[bib]
-        elif str(bib).isdigit() and int(bib) in vector_store._books:
-            book = vector_store._books[int(bib)]
-        else:
-            # Linear scan fallback
-            for b in vector_store._books.values():
-                if str(b.id) == str(bib):
-                    book = b
-                    break
-        
-        if book:
-            # valid book from dataset (has cover)
-            full_books.append(_book_to_dict(book)) # This preserves cover_url
-        else:
-            # Book not in dataset? Try DB cache as fallback
-            cached_book = db.get_book_by_title(bib) # This might return None
-            if cached_book:
-                full_books.append(cached_book)
-
-    return ReadingListResponse(
-        success=True,
-        message=f"Found {len(full_books)} books",
-        reading_list=full_books
-    )
+    
+    def stream_body() -> Iterator[bytes]:
+        yield b'{"success":true,"reading_list":['
+        count = 0
+        for row in rows:
+            book = vector_store.get_book(row["book_id"])
+            if book:
+                # valid book from dataset (preserves cover_url)
+                book_dict = _book_to_dict(book)
+            elif row["id"] is not None:
+                # Not in dataset: use the joined DB cache columns
+                book_dict = {k: row[k] for k in _BOOK_COLUMNS}
+            else:
+                continue
+            yield (b"," if count else b"") + orjson.dumps(book_dict)
+            count += 1
+        yield b'],"message":' + orjson.dumps(f"Found {count} books") + b"}"
+    
+    return StreamingResponse(stream_body(), media_type="application/json")
 
 
 @router.delete("/user/{user_id}/reading-list/{book_id}")
@@ -228,6 +230,7 @@ async def remove_from_reading_list(user_id: int, book_id: str) -> ReadingListRes
     
     # Delete from reading_list table
     db.remove_from_reading_list(user_id, book_id)
+    _recent_reading_list_adds.pop((user_id, str(book_id)), None)
     
     return ReadingListResponse(
         success=True,
@@ -5,32 +5,64 @@ Direct book retrieval and search endpoints.
 Useful for browsing, searching by genre, and retrieving book details.
 """
 
-from typing import List, Optional
+import asyncio
+import logging
+import traceback
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
 
-from fastapi import APIRouter, Depends, Query, Request
+import aiohttp
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
 
+from app.db.database import get_database
 from app.models.book import BookResponse, BookFilters
+from app.models.recommendation import RecommendationCandidate
+from app.services.cache import get_cache_service
 from app.services.retrieval import RetrievalService, get_retrieval_service
 
 router = APIRouter()
 
+# BookResponse's placeholder cover, for responses built without the model
+_NO_COVER_URL = BookResponse.model_fields["cover_url"].default
 
-@router.get("", response_model=List[BookResponse])
+# JIT enrichment debug log - configured once at import, not per request
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+_jit_log_handler = logging.FileHandler("jit_debug.log", delay=True)
+_jit_log_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+logger.addHandler(_jit_log_handler)
+
+GOOGLE_BOOKS_VOLUMES_URL = "https://www.googleapis.com/books/v1/volumes"
+
+# In-flight Google Books cover lookups (book_id -> task). Concurrent enrich
+# calls for the same book await one upstream request instead of each firing.
+_inflight_covers: Dict[str, "asyncio.Task[Optional[str]]"] = {}
+
+
+@router.get(
+    "",
+    response_class=ORJSONResponse,
+    responses={200: {"model": List[BookResponse]}}
+)
 async def list_books(
     request: Request,
-    skip: int = Query(0, ge=0, description="Number of books to skip"),
+    after_id: Optional[str] = Query(None, description="Return books after this ID (last ID of previous page)"),
     limit: int = Query(20, ge=1, le=100, description="Max books to return"),
     genre: Optional[str] = Query(None, description="Filter by genre"),
     min_rating: Optional[float] = Query(None, ge=0, le=5, description="Minimum rating")
-) -> List[BookResponse]:
+) -> ORJSONResponse:
     """
     List books with optional filtering.
     
     This endpoint provides direct access to the book catalog
     without going through the recommendation pipeline.
     
+    Uses keyset pagination (ORDER BY id, WHERE id > after_id) rather than
+    OFFSET, so every page costs O(limit) regardless of its position.
+    
     Args:
-        skip: Pagination offset
+        after_id: Pagination cursor - the last book ID of the previous page
         limit: Number of books to return
         genre: Optional genre filter
         min_rating: Optional minimum rating threshold
@@ -38,23 +70,41 @@ async def list_books(
     Returns:
         List of books matching the criteria
     """
-    # TODO: Implement actual book listing from PostgreSQL
-    # Placeholder response
-    return []
+    db = get_database()
+    rows = db.list_books(
+        after_id=after_id,
+        limit=limit,
+        genre=genre,
+        min_rating=min_rating
+    )
+    
+    return ORJSONResponse([
+        {**row, "cover_url": row.get("cover_url") or _NO_COVER_URL}
+        for row in rows
+    ])
 
 
-@router.get("/search")
+@router.get(
+    "/search",
+    response_class=ORJSONResponse,
+    # Documents the schema in OpenAPI without validating the response
+    responses={200: {"model": List[BookResponse]}}
+)
 async def search_books(
     request: Request,
     q: str = Query(..., min_length=1, description="Search query"),
     retrieval_service: RetrievalService = Depends(get_retrieval_service)
-) -> List[BookResponse]:
+) -> ORJSONResponse:
     """
     Semantic search for books using vector similarity.
     
     Unlike the chat endpoint, this returns raw search results
     without LLM reranking or explanation generation.
     
+    Results follow the BookResponse schema but are built as plain dicts
+    and encoded with orjson directly, skipping per-row Pydantic
+    validation and jsonable_encoder.
+    
     Args:
         q: Search query text
         retrieval_service: Injected retrieval service
@@ -65,8 +115,12 @@ async def search_books(
     embedding_service = request.app.state.embedding_service
     vector_store = request.app.state.vector_store
     
-    # Generate embedding for search query
-    query_embedding = await embedding_service.embed_text(q)
+    # Generate embedding for search query (repeat queries skip the model)
+    cache = get_cache_service()
+    query_embedding = cache.get_embedding(q)
+    if query_embedding is None:
+        query_embedding = await embedding_service.embed_text(q)
+        cache.set_embedding(q, query_embedding)
     
     # Retrieve candidates (no reranking)
     candidates = await retrieval_service.retrieve(
@@ -75,19 +129,57 @@ async def search_books(
     )
     
     # Convert candidates to response format
-    return [
-        BookResponse(
-            id=c.book.id,
-            title=c.book.title,
-            author=c.book.author,
-            description=c.book.description,
-            genre=c.book.genre,
-            rating=c.book.rating,
-            cover_url=c.book.cover_url,
-            similarity_score=c.similarity_score
-        )
-        for c in candidates
-    ]
+    return ORJSONResponse([_candidate_to_dict(c) for c in candidates])
+
+
+def _candidate_to_dict(candidate: RecommendationCandidate) -> Dict[str, Any]:
+    """Build a BookResponse-shaped dict without constructing the model."""
+    book = candidate.book
+    return {
+        "id": book.id,
+        "title": book.title,
+        "author": book.author,
+        "description": book.description,
+        "genre": book.genre,
+        "rating": book.rating,
+        "cover_url": book.cover_url or _NO_COVER_URL,
+        "similarity_score": candidate.similarity_score
+    }
+
+
+async def _fetch_google_cover(
+    session: aiohttp.ClientSession,
+    title: str,
+    author: str
+) -> Optional[str]:
+    """Query Google Books for the best available cover URL (None if no cover)."""
+    params = {
+        "q": f'intitle:"{title}" inauthor:"{author}"',
+        "maxResults": 1,
+        # Partial response: only the image links, not the full volume JSON
+        "fields": "items(volumeInfo/imageLinks)"
+    }
+    url = f"{GOOGLE_BOOKS_VOLUMES_URL}?{urlencode(params)}"
+    
+    async with session.get(url) as response:
+        if response.status != 200:
+            logger.error(f"Google API error: {response.status}")
+            return None
+        
+        data = await response.json()
+        if "items" not in data or len(data["items"]) == 0:
+            return None
+        
+        vol = data["items"][0].get("volumeInfo", {})
+        images = vol.get("imageLinks", {})
+        
+        # Get best available image
+        cover = (images.get("extraLarge") or 
+                 images.get("large") or 
+                 images.get("medium") or 
+                 images.get("thumbnail"))
+        
+        return cover.replace("http://", "https://") if cover else None
 
 
 @router.post("/{book_id}/enrich")
@@ -98,78 +190,57 @@ async def enrich_book_cover(
     """
     JIT Enrichment: Fetch cover from Google Books if missing.
     """
-    import aiohttp # Keep local to avoid circular import issues if any, but it's safe here
-    import logging
-    
-    # Configure logging to file for debugging
-    logging.basicConfig(filename='jit_debug.log', level=logging.INFO)
-    logger = logging.getLogger(__name__)
-    
     try:
         vector_store = request.app.state.vector_store
         
         # 1. Find book in memory
-        book = None
-        book_idx = -1
-        
-        # logger.info(f"Looking for book {book_id}")
-        
-        for i, b in enumerate(vector_store.metadata):
-            if str(b.id) == str(book_id):
-                book = b
-                book_idx = i
-                break
+        book = vector_store.get_book(book_id)
                 
         if not book:
             logger.error(f"Book {book_id} not found")
-            from fastapi import HTTPException
             raise HTTPException(status_code=404, detail="Book not found")
             
         # 2. If already has good cover, return it
         if book.cover_url and "books.google.com" in book.cover_url:
             return {"cover_url": book.cover_url, "status": "already_enriched"}
 
-        # 3. Fetch from Google Books
-        logger.info(f"Fetching from Google Books for: {book.title}")
+        # 3. Recent lookup for the same title/author? (hit or known miss)
+        cache = get_cache_service()
+        cached, cached_url = cache.get_cover(book.title, book.author)
+        if cached:
+            if cached_url:
+                book.cover_url = cached_url
+                return {"cover_url": cached_url, "status": "updated"}
+            return {"cover_url": book.cover_url, "status": "failed"}
+
+        # 4. Fetch from Google Books (shared with concurrent calls for this book)
+        key = str(book_id)
+        task = _inflight_covers.get(key)
+        if task is None:
+            logger.info(f"Fetching from Google Books for: {book.title}")
+            task = asyncio.create_task(
+                _fetch_google_cover(request.app.state.http_session, book.title, book.author)
+            )
+            _inflight_covers[key] = task
+            task.add_done_callback(lambda _: _inflight_covers.pop(key, None))
+        
+        # shield: a cancelled caller must not cancel the lookup for the others
+        new_url = await asyncio.shield(task)
         
-        async with aiohttp.ClientSession() as session:
-            query = f"intitle:{book.title} inauthor:{book.author}"
-            url = f"https://www.googleapis.com/books/v1/volumes?q={query}&maxResults=1"
+        if new_url:
+            # 5. Update in-memory store
+            # Pydantic v2 safe update
+            book.cover_url = new_url
             
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if "items" in data and len(data["items"]) > 0:
-                        vol = data["items"][0]["volumeInfo"]
-                        images = vol.get("imageLinks", {})
+            cache.set_cover(book.title, book.author, new_url)
+            return {"cover_url": new_url, "status": "updated"}
+        
+        # No usable cover: remember the miss so we don't re-query right away
+        cache.set_cover(book.title, book.author, None)
                         
-                        # Get best available image
-                        cover = (images.get("extraLarge") or 
-                                 images.get("large") or 
-                                 images.get("medium") or 
-                                 images.get("thumbnail"))
-                                 
-                        if cover:
-                            new_url = cover.replace("http://", "https://")
-                            
-                            # 4. Update in-memory store
-                            # Pydantic v2 safe update
-                            book.cover_url = new_url
-                            
-                            # Verify update worked
-                            # logger.info(f"Updated cover to {new_url}")
-                            
-                            vector_store.metadata[book_idx] = book
-                            
-                            return {"cover_url": new_url, "status": "updated"}
-                else:
-                    logger.error(f"Google API error: {response.status}")
-                            
     except Exception as e:
-        import traceback
         error_msg = traceback.format_exc()
         logger.error(f"JIT Error: {error_msg}")
-        from fastapi import HTTPException
         raise HTTPException(status_code=500, detail=f"Enrichment failed: {str(e)}")
             
     return {"cover_url": book.cover_url, "status": "failed"}
@@ -192,14 +263,9 @@ async def get_book_description(
         vector_store = request.app.state.vector_store
         
         # Find book in memory
-        book = None
-        for b in vector_store.metadata:
-            if str(b.id) == str(book_id):
-                book = b
-                break
+        book = vector_store.get_book(book_id)
         
         if not book:
-            from fastapi import HTTPException
             raise HTTPException(status_code=404, detail="Book not found")
         
         # Check if already has description
@@ -229,6 +295,5 @@ async def get_book_description(
         }
         
     except Exception as e:
-        from fastapi import HTTPException
         raise HTTPException(status_code=500, detail=f"Description generation failed: {str(e)}")
 
@@ -10,89 +10,235 @@ Chat Endpoint (Hardened - v2)
 This endpoint orchestrates the layers cleanly.
 """
 
-from fastapi import APIRouter, Depends, Request, HTTPException
-from typing import List, Dict, Optional
-import traceback
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, List, Dict, Optional, Set
+import asyncio
+import logging
 import uuid
 
+import numpy as np
+import orjson
+
 from app.models.chat import ChatRequest, ChatResponse
 from app.models.recommendation import RecommendationResult, RecommendationCandidate
 from app.models.book import BookInDB
 from app.services.retrieval import RetrievalService, get_retrieval_service
-from app.services.reranking import RerankingService, get_reranking_service, PERSONAS
+from app.services.reranking import (
+    RerankingService, get_reranking_service, HISTORY_CONTEXT_MESSAGES,
+    SUMMARY_REFRESH_MESSAGES
+)
 from app.services.profile import UserProfileService
 from app.services.personal_intelligence import get_personal_intelligence_service
+from app.services.cache import get_cache_service
+from app.services.session_store import get_session_store
 from app.db.database import get_database
+from app.config import get_settings
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# In-flight query embeddings (query -> task), shared by concurrent misses
+_inflight_embeddings: Dict[str, "asyncio.Task[np.ndarray]"] = {}
+
+# Fire-and-forget tasks (JIT ingestion, chat summaries); held so they
+# aren't garbage collected
+_background_tasks: Set["asyncio.Task[None]"] = set()
+
+# Users whose chat summary is being refreshed (one refresh at a time each)
+_summarizing: Set[int] = set()
+
+
+@dataclass(slots=True, frozen=True)
+class UserContext:
+    """Per-request user profile, personality and chat history."""
+    is_anonymous: bool
+    personality: str = "friendly"
+    display_name: str = "friend"
+    chat_history: List[Dict] = field(default_factory=list)
+    chat_summary: str = ""
+    insights: List[Dict] = field(default_factory=list)
+    favorite_genres: List[str] = field(default_factory=list)
+    user_id: Optional[int] = None
 
-# Fallback in-memory sessions for anonymous users
-_anonymous_sessions: Dict[str, List[Dict[str, str]]] = {}
 
+# Shared context for anonymous / unknown users (immutable, safe to reuse)
+_ANONYMOUS_CONTEXT = UserContext(is_anonymous=True)
 
-def get_user_context(user_id: Optional[int]) -> Dict:
+
+async def get_user_context(user_id: Optional[int]) -> UserContext:
     """Load user profile, personality, and chat history from database."""
     if not user_id:
-        return {
-            "is_anonymous": True,
-            "personality": "friendly",
-            "display_name": "friend",
-            "chat_history": [],
-            "insights": []
-        }
+        return _ANONYMOUS_CONTEXT
     
     db = get_database()
-    user = db.get_user(user_id)
+    # Only the last few messages reach the analyzer prompt; load just those
+    bundle = await asyncio.to_thread(
+        db.get_user_bundle, user_id, history_limit=HISTORY_CONTEXT_MESSAGES
+    )
     
-    if not user:
-        return {
-            "is_anonymous": True,
-            "personality": "friendly",
-            "display_name": "friend",
-            "chat_history": [],
-            "insights": []
-        }
+    if not bundle:
+        return _ANONYMOUS_CONTEXT
+    
+    user = bundle["user"]
+    
+    return UserContext(
+        is_anonymous=False,
+        user_id=user_id,
+        personality=user.get("personality", "friendly"),
+        display_name=user.get("display_name", user.get("username", "friend")),
+        chat_history=bundle["chat_history"],
+        chat_summary=bundle["chat_summary"],
+        insights=bundle["insights"],
+        favorite_genres=user.get("favorite_genres", [])
+    )
+
+
+async def get_profile_summary(user_id: Optional[int]) -> str:
+    """Build the LLM profile summary off the event loop ("" when anonymous)."""
+    if not user_id:
+        return ""
+    profile_service = UserProfileService(get_database())
+    return await asyncio.to_thread(profile_service.get_profile_summary, user_id)
+
+
+async def _profile_hint(profile_task: "asyncio.Task[str]") -> str:
+    """
+    The profile summary if it is ready within the wait budget, else "".
+    
+    The intent prompt only uses it as a hint, so a slow profile build
+    shouldn't hold up the LLM call; the task keeps running for later use.
+    """
+    await asyncio.wait({profile_task}, timeout=get_settings().profile_summary_wait_seconds)
+    if profile_task.done() and not profile_task.cancelled() and profile_task.exception() is None:
+        return profile_task.result()
+    return ""
+
+
+# Bare acknowledgements/greetings that carry no preference signal
+_LOW_SIGNAL_MESSAGES = frozenset({
+    "hi", "hey", "hello", "ok", "okay", "k", "thanks", "thank you", "thx",
+    "ty", "cool", "nice", "great", "lol"
+})
+# Max stored message size (UTF-8 bytes)
+_MAX_HISTORY_BYTES = 16 * 1024
+
+
+def _new_session_id() -> str:
+    """Mint an anonymous session ID (only called when the client sent none)."""
+    return uuid.uuid4().hex
+
+
+def is_low_signal(text: str) -> bool:
+    """True for empty messages and bare acknowledgements like "ok" or "thanks!"."""
+    normalized = " ".join(text.lower().split()).strip(" .!?,~")
+    return not normalized or normalized in _LOW_SIGNAL_MESSAGES
+
+
+async def save_to_history(user_id: Optional[int], session_id: str, role: str, content: str) -> bool:
+    """
+    Save message to database (if logged in) or the session store (if anonymous).
     
-    chat_history = db.get_chat_history(user_id, limit=20)
-    insights = db.get_user_insights(user_id)
+    Low-signal user messages are skipped so the short history window
+    holds turns that matter; content is capped at 16 KB. Returns False if
+    the message was skipped, so callers can drop the paired reply too.
+    DB writes go to the database's write-behind queue and are not waited on.
+    """
+    if role == "user" and is_low_signal(content):
+        return False
+    if len(content) > _MAX_HISTORY_BYTES // 4:
+        content = content.encode("utf-8")[:_MAX_HISTORY_BYTES].decode("utf-8", "ignore")
     
-    return {
-        "is_anonymous": False,
-        "user_id": user_id,
-        "personality": user.get("personality", "friendly"),
-        "display_name": user.get("display_name", user.get("username", "friend")),
-        "chat_history": chat_history,
-        "insights": insights,
-        "favorite_genres": user.get("favorite_genres", "[]")
-    }
-
-
-def save_to_history(user_id: Optional[int], session_id: str, role: str, content: str):
-    """Save message to database (if logged in) or in-memory (if anonymous)."""
     if user_id:
         db = get_database()
         db.add_chat_message(user_id, role, content)
+        if role == "assistant" and user_id not in _summarizing:
+            _spawn(_refresh_chat_summary(user_id))
     else:
-        if session_id not in _anonymous_sessions:
-            _anonymous_sessions[session_id] = []
-        _anonymous_sessions[session_id].append({"role": role, "content": content})
-        if len(_anonymous_sessions[session_id]) > 20:
-            _anonymous_sessions[session_id] = _anonymous_sessions[session_id][-20:]
+        await get_session_store().append(session_id, {"role": role, "content": content})
+    return True
+
+
+def _spawn(coro) -> None:
+    """Run a coroutine as a fire-and-forget background task."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _refresh_chat_summary(user_id: int):
+    """
+    Fold messages that have aged out of the analyzer's history window into
+    the user's rolling chat summary, once SUMMARY_REFRESH_MESSAGES new
+    messages have piled up. Runs after the response, never on the hot path.
+    """
+    if user_id in _summarizing:
+        return
+    _summarizing.add(user_id)
+    try:
+        # Make sure this turn's messages are stored before counting them
+        db = get_database()
+        await asyncio.to_thread(db.flush_writes)
+        state = await asyncio.to_thread(db.get_chat_summary_state, user_id)
+        new_messages = state["total"] - state["message_count"]
+        if new_messages < SUMMARY_REFRESH_MESSAGES:
+            return
+        
+        # Messages newer than the last summary, minus the recent window
+        # that analyze_query still sees verbatim
+        recent = await asyncio.to_thread(
+            db.get_chat_history, user_id, limit=min(new_messages, 40) + HISTORY_CONTEXT_MESSAGES
+        )
+        summary = await get_reranking_service().summarize_history(
+            state["summary"], recent[:-HISTORY_CONTEXT_MESSAGES]
+        )
+        if summary:
+            await asyncio.to_thread(db.set_chat_summary, user_id, summary, state["total"])
+    except Exception as e:
+        logger.warning("Chat summary refresh failed: %s", e)
+    finally:
+        _summarizing.discard(user_id)
+
+
+async def _embed_query(embedding_service, query: str):
+    """
+    Embed a search query, serving repeat phrasings from the cache.
+    
+    Concurrent misses for the same query await one shared embed call
+    instead of stampeding the model.
+    """
+    cache = get_cache_service()
+    embedding = cache.get_embedding(query)
+    if embedding is not None:
+        return embedding
+    
+    task = _inflight_embeddings.get(query)
+    if task is None:
+        task = asyncio.create_task(embedding_service.embed_text(query))
+        _inflight_embeddings[query] = task
+        task.add_done_callback(lambda _: _inflight_embeddings.pop(query, None))
+    
+    # shield: a cancelled (e.g. speculative) caller must not cancel it for the others
+    embedding = await asyncio.shield(task)
+    cache.set_embedding(query, embedding)
+    return embedding
+
+
+# Persona intro templates for recommendation replies, keyed by personality
+PERSONA_MESSAGE_TEMPLATES = {
+    "friendly": "I found {n} books I think you'll love! 📚",
+    "professional": "I have identified {n} titles that align with your criteria.",
+    "flirty": "Oh, I found some gems for you! {n} books I think you'll fall for 😏",
+    "mentor": "I've selected {n} books that I believe will serve your journey.",
+    "sarcastic": "Against all odds, I found {n} books you might actually enjoy."
+}
 
 
 def generate_persona_message(personality: str, book_count: int) -> str:
     """Generate a persona-appropriate intro message for recommendations."""
-    persona = PERSONAS.get(personality, PERSONAS["friendly"])
-    name = persona["name"]
-    
-    templates = {
-        "friendly": f"I found {book_count} books I think you'll love! 📚",
-        "professional": f"I have identified {book_count} titles that align with your criteria.",
-        "flirty": f"Oh, I found some gems for you! {book_count} books I think you'll fall for 😏",
-        "mentor": f"I've selected {book_count} books that I believe will serve your journey.",
-        "sarcastic": f"Against all odds, I found {book_count} books you might actually enjoy."
-    }
-    return templates.get(personality, templates["friendly"])
+    template = PERSONA_MESSAGE_TEMPLATES.get(personality, PERSONA_MESSAGE_TEMPLATES["friendly"])
+    return template.format(n=book_count)
 
 
 @router.post("", response_model=ChatResponse)
@@ -101,9 +247,26 @@ async def get_recommendations(
     chat_request: ChatRequest,
     retrieval_service: RetrievalService = Depends(get_retrieval_service),
     reranking_service: RerankingService = Depends(get_reranking_service)
+) -> ORJSONResponse:
+    """
+    Main chat endpoint.
+    
+    The pipeline already builds a validated ChatResponse, so it is dumped
+    straight to orjson; returning the model would make FastAPI re-validate
+    it against response_model and run jsonable_encoder first.
+    """
+    chat_response = await _run_chat(request, chat_request, retrieval_service, reranking_service)
+    return ORJSONResponse(chat_response.model_dump())
+
+
+async def _run_chat(
+    request: Request,
+    chat_request: ChatRequest,
+    retrieval_service: RetrievalService,
+    reranking_service: RerankingService
 ) -> ChatResponse:
     """
-    Main chat endpoint with 4-layer architecture.
+    Chat pipeline with 4-layer architecture.
     
     Flow:
     1. UNDERSTANDING: Analyze intent & extract context (LLM).
@@ -111,33 +274,41 @@ async def get_recommendations(
     3. RETRIEVAL: Vector search + SQL fallback.
     4. NARRATION: Generate personalized explanations (LLM).
     """
+    # Resolved once up front so the error path reports the same session
+    session_id = getattr(chat_request, 'session_id', None) or _new_session_id()
+    
     try:
         embedding_service = request.app.state.embedding_service
         vector_store = request.app.state.vector_store
         
         user_id = getattr(chat_request, 'user_id', None)
-        session_id = getattr(chat_request, 'session_id', None) or str(uuid.uuid4())
         
-        user_context = get_user_context(user_id)
+        # Built in the background; overlaps the context load and intent analysis
+        profile_task = asyncio.create_task(get_profile_summary(user_id))
+        user_context = await get_user_context(user_id)
         # Use request personality if provided, else fall back to DB/default
-        personality = getattr(chat_request, 'personality', None) or user_context["personality"]
-        display_name = user_context["display_name"]
+        personality = getattr(chat_request, 'personality', None) or user_context.personality
+        display_name = user_context.display_name
         
-        if user_context["is_anonymous"]:
-            if session_id not in _anonymous_sessions:
-                _anonymous_sessions[session_id] = []
-            chat_history = _anonymous_sessions[session_id]
-        else:
-            chat_history = user_context["chat_history"]
+        # Replies to skipped (low-signal) turns are skipped as well
+        turn_saved = await save_to_history(user_id, session_id, "user", chat_request.message)
         
-        save_to_history(user_id, session_id, "user", chat_request.message)
+        if user_context.is_anonymous:
+            chat_history = await get_session_store().get_history(session_id)
+        else:
+            chat_history = user_context.chat_history
         
-        # ============ GENERATE USER PROFILE SUMMARY ============
         db = get_database()
-        profile_service = UserProfileService(db)
-        profile_summary = profile_service.get_profile_summary(user_id) if user_id else ""
         
-        print(f"[Chat] User: {display_name} | Persona: {personality} | Msg: '{chat_request.message[:50]}...'")
+        logger.info("User: %s | Persona: %s | Msg: '%s...'", display_name, personality, chat_request.message[:50])
+        
+        # Speculatively embed the raw message while the LLM analyzes intent;
+        # reused at retrieval when the optimized query has the same tokens.
+        speculative_embedding = asyncio.create_task(
+            _embed_query(embedding_service, chat_request.message)
+        )
+        # Unused on chat-only turns; don't warn about an unretrieved error
+        speculative_embedding.add_done_callback(lambda t: t.cancelled() or t.exception())
         
         # ============ LAYER 2: UNDERSTANDING ============
         try:
@@ -146,10 +317,11 @@ async def get_recommendations(
                 chat_history=chat_history,
                 personality=personality,
                 user_name=display_name,
-                user_profile_summary=profile_summary
+                user_profile_summary=await _profile_hint(profile_task),
+                conversation_summary=user_context.chat_summary
             )
         except Exception as e:
-            print(f"[Chat] analyze_query failed: {e}")
+            logger.warning("analyze_query failed: %s", e)
             # Graceful fallback: assume user wants book search
             analysis = {
                 "needs_book_search": True,
@@ -160,14 +332,18 @@ async def get_recommendations(
                 "specific_book_requested": None
             }
         
+        profile_summary = await profile_task
+        
         needs_search = analysis.get("needs_book_search", True)
         direct_response = analysis.get("direct_response")
         
-        print(f"  -> Intent: {'SEARCH' if needs_search else 'CHAT'} | Mood: {analysis.get('emotional_context')}")
+        logger.info("  -> Intent: %s | Mood: %s", "SEARCH" if needs_search else "CHAT", analysis.get("emotional_context"))
         
         # If just chatting, return direct response (no DB hit)
         if not needs_search and direct_response:
-            save_to_history(user_id, session_id, "assistant", direct_response)
+            speculative_embedding.cancel()
+            if turn_saved:
+                await save_to_history(user_id, session_id, "assistant", direct_response)
             return ChatResponse(
                 message=direct_response,
                 recommendations=[],
@@ -183,11 +359,20 @@ async def get_recommendations(
         specific_book = search_strategy["specific_title"]
         mood = analysis.get("emotional_context", "neutral")
         
+        # Start the query embedding now so it overlaps the title lookup below;
+        # common phrasings ("cozy mystery") reuse the speculative one
+        if set(optimized_query.lower().split()) == set(chat_request.message.lower().split()):
+            query_embedding_task = speculative_embedding
+        else:
+            speculative_embedding.cancel()
+            query_embedding_task = asyncio.create_task(_embed_query(embedding_service, optimized_query))
+            query_embedding_task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        
         # ============ PERSONAL INTELLIGENCE: Strategy ============
         pi_service = get_personal_intelligence_service()
         strategy = pi_service.predict_strategy(mood)
         
-        print(f"  -> Search: '{optimized_query}' | Count: {requested_count} | Strategy: {strategy}")
+        logger.info("  -> Search: '%s' | Count: %s | Strategy: %s", optimized_query, requested_count, strategy)
         
         # ============ LOG SEARCH QUERY FOR PERSONALIZATION ============
         if user_id:
@@ -202,17 +387,14 @@ async def get_recommendations(
         book_not_found_title = None  # Track if specific book search failed
         
         if specific_book:
-            print(f"  -> User requested specific book: '{specific_book}'")
+            logger.info("  -> User requested specific book: '%s'", specific_book)
             # 1. Try fuzzy match in local Vector Store
-            local_matches = [
-                b for b in vector_store._books.values() 
-                if specific_book.lower() in b.title.lower()
-            ]
+            local_matches = vector_store.find_by_title_substring(specific_book, top=3)
             
             if local_matches:
-                print(f"  -> Found {len(local_matches)} local matches.")
+                logger.info("  -> Found %d local matches.", len(local_matches))
                 # Use local matches as candidates
-                for match in local_matches[:3]:  # Top 3 local matches
+                for match in local_matches:
                     candidates.append(RecommendationCandidate(
                         book=match,
                         similarity_score=2.0,
@@ -221,7 +403,7 @@ async def get_recommendations(
                     ))
                 jit_book_found = True
             else:
-                print(f"  -> NOT FOUND LOCALLY. Searching external APIs for: '{specific_book}'")
+                logger.info("  -> NOT FOUND LOCALLY. Searching external APIs for: '%s'", specific_book)
                 # 2. Use ExternalBookSearch (Google Books -> Open Library -> LLM)
                 from app.services.external_search import get_external_search_service
                 search_service = get_external_search_service()
@@ -230,7 +412,7 @@ async def get_recommendations(
                 found_books = await search_service.search(specific_book, max_results=1)
                 
                 if found_books:
-                    print(f"  -> External Search SUCCESS. Found: '{found_books[0].title}'")
+                    logger.info("  -> External Search SUCCESS. Found: '%s'", found_books[0].title)
                     jit_book_found = True
                     
                     # Add found book as candidate
@@ -241,64 +423,63 @@ async def get_recommendations(
                         combined_score=2.0
                     ))
                 else:
-                    print(f"  -> External Search FAILED. Book not found anywhere.")
+                    logger.info("  -> External Search FAILED. Book not found anywhere.")
                     # Mark book as not found for frontend feedback
                     book_not_found_title = specific_book
         
         # ============ RETRIEVAL: Vector + SQL Fallback ============
-        if not jit_book_found:
+        cache = get_cache_service()
+        rec_cache_context = None  # Set when the final results may be cached
+        
+        if jit_book_found:
+            query_embedding_task.cancel()
+        else:
             try:
-                query_embedding = await embedding_service.embed_text(optimized_query)
-            
+                query_embedding = await query_embedding_task
+                
+                # Same embedding + context -> same reranked results. A hit skips
+                # retrieval and the rerank LLM call; catalog size invalidates
+                # entries once JIT adds books to the vector store.
+                if not specific_book:
+                    rec_cache_context = {
+                        "filters": chat_request.preferences.model_dump() if chat_request.preferences else None,
+                        "count": requested_count,
+                        "personality": personality,
+                        "user_name": display_name,
+                        "profile": profile_summary,
+                        "mood": mood,
+                        "strategy": strategy,
+                        "catalog_size": vector_store.size
+                    }
+                    cached_recs = cache.get_recommendations(query_embedding, rec_cache_context)
+                    if cached_recs:
+                        logger.info("  -> Recommendation cache hit (%d books)", len(cached_recs))
+                        message = generate_persona_message(personality, len(cached_recs))
+                        if turn_saved:
+                            await save_to_history(user_id, session_id, "assistant", message)
+                        return ChatResponse(
+                            message=message,
+                            recommendations=[r.model_copy() for r in cached_recs],
+                            query_understood=True,
+                            session_id=session_id
+                        )
+                
                 candidates: List[RecommendationCandidate] = await retrieval_service.retrieve(
                     query_embedding=query_embedding,
                     vector_store=vector_store,
                     filters=chat_request.preferences
                 )
             except Exception as embed_error:
-                print(f"  -> Embedding/Vector search failed: {embed_error}. Using SQL fallback.")
+                logger.warning("  -> Embedding/Vector search failed: %s. Using SQL fallback.", embed_error)
                 candidates = []  # Force SQL fallback
+                rec_cache_context = None
         
         # SQL FALLBACK: If vector search misses, check the persistent DB
         if not candidates:
-            print(f"  -> Vector empty. SQL fallback for: '{optimized_query}'")
-            db = get_database()
-            sql_results = db.search_books_sql(optimized_query, limit=requested_count)
-            
-            for row in sql_results:
-                try:
-                    book = BookInDB(
-                        id=row["id"],
-                        title=row["title"],
-                        author=row["author"],
-                        description=row.get("description", ""),
-                        genre=row.get("genre", "General"),
-                        rating=row.get("rating", 0.0),
-                        cover_url=row.get("cover_url"),
-                        year_published=row.get("year_published"),
-                        is_dynamic=False
-                    )
-                    candidates.append(RecommendationCandidate(
-                        book=book,
-                        similarity_score=1.0,
-                        metadata_score=1.0,
-                        combined_score=1.0
-                    ))
-                except Exception as e:
-                    print(f"  -> SQL->BookInDB error: {e}")
+            candidates = _sql_fallback_candidates(optimized_query, requested_count)
         
         # ============ PERSONAL INTELLIGENCE: Re-score Candidates ============
-        if candidates:
-            try:
-                book_ids = [c.book.id for c in candidates]
-                scored = pi_service.predict_scores(book_ids, mood)
-                
-                # Re-order candidates by model scores
-                id_to_score = {bid: score for bid, score in scored}
-                candidates.sort(key=lambda c: id_to_score.get(c.book.id, 0), reverse=True)
-                print(f"  -> Candidates re-ranked by Personal Intelligence Model")
-            except Exception as pi_error:
-                print(f"  -> Personal Intelligence scoring failed: {pi_error}. Using original order.")
+        _rescore_candidates(pi_service, candidates, mood)
         
         # ============ LAYER 4: NARRATION (Voice Only) ============
         try:
@@ -315,7 +496,8 @@ async def get_recommendations(
                 top_k=requested_count
             )
         except Exception as rerank_error:
-            print(f"  -> Rerank failed: {rerank_error}. Using fallback explanations.")
+            logger.warning("  -> Rerank failed: %s. Using fallback explanations.", rerank_error)
+            rec_cache_context = None  # Don't cache placeholder explanations
             # Create simple results without LLM explanations
             recommendations = []
             for rank, c in enumerate(candidates[:requested_count], start=1):
@@ -332,63 +514,55 @@ async def get_recommendations(
                     rank=rank
                 ))
         
-        # Deduplicate
-        seen_ids = set()
-        unique_recs = []
-        for rec in recommendations:
-            if rec.book_id not in seen_ids:
-                seen_ids.add(rec.book_id)
-                unique_recs.append(rec)
-        recommendations = unique_recs[:requested_count]
+        # Candidates and reranker output are already unique by book_id
+        recommendations = recommendations[:requested_count]
         
         # ============ JIT DESCRIPTION ENRICHMENT (PARALLEL) ============
         from app.services.description import get_description_service
-        import asyncio
         
         desc_service = get_description_service()
-        enrich_tasks = []
-        
-        # Identify books needing enrichment
-        for rec in recommendations:
-            if not rec.description or len(rec.description) < 30:
-                enrich_tasks.append(
-                    desc_service.get_or_generate(
-                        book_id=rec.book_id,
-                        title=rec.title,
-                        author=rec.author,
-                        genre=rec.genre
-                    )
-                )
-            else:
-                enrich_tasks.append(None) # Placeholders to match index
+        
+        # Short/missing descriptions, keyed by their position in recommendations
+        enrich_coros = {
+            i: desc_service.get_or_generate(
+                book_id=rec.book_id,
+                title=rec.title,
+                author=rec.author,
+                genre=rec.genre
+            )
+            for i, rec in enumerate(recommendations)
+            if not rec.description or len(rec.description) < 30
+        }
         
         # Run all requests in parallel
-        if any(t is not None for t in enrich_tasks):
-            print(f"  -> Enriching {len([t for t in enrich_tasks if t])} descriptions in parallel...")
-            results = await asyncio.gather(*[t for t in enrich_tasks if t is not None], return_exceptions=True)
+        if enrich_coros:
+            logger.info("  -> Enriching %d descriptions in parallel...", len(enrich_coros))
+            results = await asyncio.gather(*enrich_coros.values(), return_exceptions=True)
             
             # Map results back to recommendations
-            result_idx = 0
-            for i, task in enumerate(enrich_tasks):
-                if task is not None:
-                    desc = results[result_idx]
-                    result_idx += 1
-                    
-                    if isinstance(desc, str):
-                        recommendations[i].description = desc
-                    else:
-                        print(f"  -> Enrichment error for {recommendations[i].title}: {desc}")
+            for i, desc in zip(enrich_coros, results):
+                if isinstance(desc, str):
+                    recommendations[i].description = desc
+                else:
+                    logger.warning("  -> Enrichment error for %s: %s", recommendations[i].title, desc)
+        
+        if rec_cache_context is not None and recommendations:
+            cache.set_recommendations(
+                query_embedding, rec_cache_context,
+                tuple(r.model_copy() for r in recommendations)
+            )
         
         # If specific book requested but not found, try JIT
         if specific_book and not any(specific_book.lower() in r.title.lower() for r in recommendations):
-            print(f"  -> Specific '{specific_book}' not found. Triggering JIT...")
+            logger.info("  -> Specific '%s' not found. Triggering JIT...", specific_book)
             recommendations = await _jit_search(
                 request, chat_request.message, requested_count, 
                 reranking_service, personality, display_name
             )
             if recommendations:
                 message = generate_persona_message(personality, len(recommendations))
-                save_to_history(user_id, session_id, "assistant", message)
+                if turn_saved:
+                    await save_to_history(user_id, session_id, "assistant", message)
                 return ChatResponse(
                     message=message,
                     recommendations=recommendations,
@@ -398,13 +572,14 @@ async def get_recommendations(
         
         # If still empty, use LLM knowledge fallback
         if not recommendations:
-            print("  -> No results. Using LLM knowledge fallback...")
+            logger.info("  -> No results. Using LLM knowledge fallback...")
             fallback_text = await reranking_service.generate_from_knowledge(
                 user_message=chat_request.message,
                 personality=personality,
                 user_name=display_name
             )
-            save_to_history(user_id, session_id, "assistant", fallback_text)
+            if turn_saved:
+                await save_to_history(user_id, session_id, "assistant", fallback_text)
             return ChatResponse(
                 message=fallback_text,
                 recommendations=[],
@@ -414,7 +589,8 @@ async def get_recommendations(
         
         # Success: Generate persona message
         message = generate_persona_message(personality, len(recommendations))
-        save_to_history(user_id, session_id, "assistant", message)
+        if turn_saved:
+            await save_to_history(user_id, session_id, "assistant", message)
         
         return ChatResponse(
             message=message,
@@ -425,25 +601,90 @@ async def get_recommendations(
         )
         
     except Exception as e:
-        print(f"[Chat] Error: {e}")
-        traceback.print_exc()
+        logger.exception("get_recommendations failed: %s", e)
         # Return user-friendly response instead of HTTP 500
         error_message = "I had a hiccup processing your request. Let me try a simpler approach..."
         
         # Try to give SOMETHING useful
-        from app.services.reranking import PERSONAS
-        persona = PERSONAS.get("friendly", PERSONAS["friendly"])
         fallback_msg = f"{error_message} Ask me anything about books and I'll do my best to help!"
         
         return ChatResponse(
             message=fallback_msg,
             recommendations=[],
             query_understood=False,
-            session_id=getattr(chat_request, 'session_id', None) or str(uuid.uuid4()),
+            session_id=session_id,
             error_message=str(e)
         )
 
 
+def _sql_fallback_candidates(query: str, limit: int) -> List[RecommendationCandidate]:
+    """SQL FALLBACK: If vector search misses, check the persistent DB."""
+    logger.info("  -> Vector empty. SQL fallback for: '%s'", query)
+    db = get_database()
+    sql_results = db.search_books_sql(query, limit=limit)
+    
+    candidates = []
+    for row in sql_results:
+        try:
+            book = BookInDB(
+                id=row["id"],
+                title=row["title"],
+                author=row["author"],
+                description=row.get("description", ""),
+                genre=row.get("genre", "General"),
+                rating=row.get("rating", 0.0),
+                cover_url=row.get("cover_url"),
+                year_published=row.get("year_published"),
+                is_dynamic=False
+            )
+            candidates.append(RecommendationCandidate(
+                book=book,
+                similarity_score=1.0,
+                metadata_score=1.0,
+                combined_score=1.0
+            ))
+        except Exception as e:
+            logger.warning("  -> SQL->BookInDB error: %s", e)
+    return candidates
+
+
+def _rescore_candidates(pi_service, candidates: List[RecommendationCandidate], mood: str) -> None:
+    """Re-order candidates in place by Personal Intelligence model scores."""
+    if not candidates:
+        return
+    try:
+        scores = pi_service.score_array([c.book.id for c in candidates], mood)
+        
+        # Re-order candidates by model scores (ties keep retrieval order)
+        order = np.argsort(-scores, kind="stable")
+        candidates[:] = [candidates[i] for i in order]
+        logger.info("  -> Candidates re-ranked by Personal Intelligence Model")
+    except Exception as pi_error:
+        logger.warning("  -> Personal Intelligence scoring failed: %s. Using original order.", pi_error)
+
+
+async def _ingest_jit_books(vector_store, books: List[BookInDB], embeddings: np.ndarray):
+    """Persist JIT-found books to the DB and FAISS (runs after the response)."""
+    try:
+        db = get_database()
+        await asyncio.to_thread(db.add_books, [
+            {
+                "id": book.id,
+                "title": book.title,
+                "author": book.author,
+                "description": book.description,
+                "genre": book.genre,
+                "rating": book.rating,
+                "cover_url": book.cover_url,
+                "source": "google_books" if not book.is_dynamic else "ai_generated"
+            }
+            for book in books
+        ])
+        await vector_store.add(embeddings, books)
+    except Exception as e:
+        logger.warning("JIT ingestion failed: %s", e)
+
+
 async def _jit_search(
     request: Request,
     user_message: str,
@@ -458,7 +699,6 @@ async def _jit_search(
         
         embedding_service = request.app.state.embedding_service
         vector_store = request.app.state.vector_store
-        db = get_database()
         
         external_search = get_external_search_service()
         dynamic_books = await external_search.search(query=user_message, max_results=count)
@@ -466,25 +706,18 @@ async def _jit_search(
         if not dynamic_books:
             return []
         
+        # Embed all found books in one batched model call
+        book_embeddings = await embedding_service.embed_texts([
+            f"{book.title} by {book.author}. {book.description}"
+            for book in dynamic_books
+        ])
+        
+        # Index for future searches in the background; this response only
+        # needs the books themselves
+        _spawn(_ingest_jit_books(vector_store, dynamic_books, book_embeddings))
+        
         results = []
         for book in dynamic_books:
-            # Persist to SQLite
-            db.add_book({
-                "id": book.id,
-                "title": book.title,
-                "author": book.author,
-                "description": book.description,
-                "genre": book.genre,
-                "rating": book.rating,
-                "cover_url": book.cover_url,
-                "source": "google_books" if not book.is_dynamic else "ai_generated"
-            })
-            
-            # Add to FAISS for future searches
-            book_text = f"{book.title} by {book.author}. {book.description}"
-            book_embedding = await embedding_service.embed_text(book_text)
-            await vector_store.add_book_dynamic(book, book_embedding)
-            
             results.append(RecommendationResult(
                 book_id=book.id,
                 title=book.title,
@@ -500,11 +733,146 @@ async def _jit_search(
         return results
         
     except Exception as e:
-        print(f"[JIT Search] Error: {e}")
+        logger.warning("JIT search failed: %s", e)
         return []
 
 
+def _sse(event: str, data: Any) -> bytes:
+    """Encode one Server-Sent Events frame."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
 @router.post("/stream")
-async def get_recommendations_stream(chat_request: ChatRequest):
-    """Streaming endpoint placeholder."""
-    raise NotImplementedError("Streaming not yet implemented")
+async def get_recommendations_stream(
+    request: Request,
+    chat_request: ChatRequest,
+    retrieval_service: RetrievalService = Depends(get_retrieval_service),
+    reranking_service: RerankingService = Depends(get_reranking_service)
+) -> StreamingResponse:
+    """
+    Streaming (SSE) variant of the chat endpoint.
+    
+    Events, in order:
+    - analysis: intent, mood and search query (after the Understanding layer)
+    - recommendation: one per book, as soon as its explanation has streamed
+    - message: the persona intro, or the direct/fallback reply
+    - done: {"session_id"}; "error" replaces it if the pipeline fails
+    
+    Specific-title JIT lookup and description enrichment are left to the
+    non-streaming endpoint.
+    """
+    embedding_service = request.app.state.embedding_service
+    vector_store = request.app.state.vector_store
+    
+    user_id = getattr(chat_request, 'user_id', None)
+    session_id = getattr(chat_request, 'session_id', None) or _new_session_id()
+    
+    async def event_gen() -> AsyncIterator[bytes]:
+        try:
+            profile_task = asyncio.create_task(get_profile_summary(user_id))
+            user_context = await get_user_context(user_id)
+            personality = getattr(chat_request, 'personality', None) or user_context.personality
+            display_name = user_context.display_name
+            
+            # Replies to skipped (low-signal) turns are skipped as well
+            turn_saved = await save_to_history(user_id, session_id, "user", chat_request.message)
+            
+            if user_context.is_anonymous:
+                chat_history = await get_session_store().get_history(session_id)
+            else:
+                chat_history = user_context.chat_history
+            
+            db = get_database()
+            
+            # Understanding
+            try:
+                analysis = await reranking_service.analyze_query(
+                    user_message=chat_request.message,
+                    chat_history=chat_history,
+                    personality=personality,
+                    user_name=display_name,
+                    user_profile_summary=await _profile_hint(profile_task),
+                    conversation_summary=user_context.chat_summary
+                )
+            except Exception as e:
+                logger.warning("analyze_query failed (stream): %s", e)
+                analysis = {"needs_book_search": True, "optimized_query": chat_request.message}
+            
+            profile_summary = await profile_task
+            
+            search_strategy = reranking_service.decide_search_strategy(analysis)
+            optimized_query = search_strategy["search_query"] or chat_request.message
+            requested_count = search_strategy["result_count"]
+            mood = analysis.get("emotional_context", "neutral")
+            needs_search = analysis.get("needs_book_search", True)
+            direct_response = analysis.get("direct_response")
+            
+            yield _sse("analysis", {
+                "needs_book_search": needs_search,
+                "emotional_context": mood,
+                "optimized_query": optimized_query,
+                "result_count": requested_count
+            })
+            
+            if not needs_search and direct_response:
+                if turn_saved:
+                    await save_to_history(user_id, session_id, "assistant", direct_response)
+                yield _sse("message", {"message": direct_response})
+                yield _sse("done", {"session_id": session_id})
+                return
+            
+            pi_service = get_personal_intelligence_service()
+            strategy = pi_service.predict_strategy(mood)
+            if user_id:
+                db.log_search_query(user_id, optimized_query)
+            
+            # Retrieval
+            try:
+                query_embedding = await _embed_query(embedding_service, optimized_query)
+                candidates = await retrieval_service.retrieve(
+                    query_embedding=query_embedding,
+                    vector_store=vector_store,
+                    filters=chat_request.preferences
+                )
+            except Exception as embed_error:
+                logger.warning("  -> Embedding/Vector search failed: %s. Using SQL fallback.", embed_error)
+                candidates = []
+            if not candidates:
+                candidates = _sql_fallback_candidates(optimized_query, requested_count)
+            _rescore_candidates(pi_service, candidates, mood)
+            
+            # Narration, one frame per book as its explanation completes
+            count = 0
+            async for rec in reranking_service.rerank_stream(
+                candidates=candidates,
+                user_context={
+                    "message": chat_request.message,
+                    "emotional_context": mood,
+                    "personality": personality,
+                    "user_name": display_name,
+                    "profile_summary": profile_summary,
+                    "strategy": strategy
+                },
+                top_k=requested_count
+            ):
+                count += 1
+                yield _sse("recommendation", rec.model_dump())
+            
+            if count:
+                message = generate_persona_message(personality, count)
+            else:
+                message = await reranking_service.generate_from_knowledge(
+                    user_message=chat_request.message,
+                    personality=personality,
+                    user_name=display_name
+                )
+            if turn_saved:
+                await save_to_history(user_id, session_id, "assistant", message)
+            yield _sse("message", {"message": message})
+            yield _sse("done", {"session_id": session_id})
+            
+        except Exception as e:
+            logger.exception("get_recommendations_stream failed: %s", e)
+            yield _sse("error", {"message": str(e), "session_id": session_id})
+    
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
@@ -6,13 +6,24 @@ Provides homepage data for Netflix-style browsing:
 - Genre-based carousels (Trending, Romance, Action, etc.)
 """
 
+import hashlib
+import logging
 import random
-from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Request, Query
+from typing import List, Dict, Any, Optional, Tuple
+import orjson
+from cachetools import TTLCache
+from fastapi import APIRouter, Request, Response, Query
+from fastapi.responses import ORJSONResponse
 
+from app.db.vector_store import VectorStore
 from app.models.book import BookInDB
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Category rows per (limit, catalog version) -> (categories, etag). Rows only
+# change with the catalog; the hero is still picked per request.
+_categories_cache: TTLCache = TTLCache(maxsize=64, ttl=60)
 
 
 def _book_to_dict(book: BookInDB) -> Dict[str, Any]:
@@ -28,77 +39,92 @@ def _book_to_dict(book: BookInDB) -> Dict[str, Any]:
     }
 
 
-def _get_books_by_genre(books: Dict[int, BookInDB], genre: str, limit: int = 20) -> List[Dict]:
-    """Filter books by genre (case-insensitive partial match)."""
-    genre_lower = genre.lower()
-    matching = [
-        b for b in books.values() 
-        if genre_lower in b.genre.lower()
-    ]
-    # Sort by rating descending
-    matching.sort(key=lambda x: x.rating, reverse=True)
-    return [_book_to_dict(b) for b in matching[:limit]]
+def _get_books_by_genre(vector_store: VectorStore, genre: str, limit: int = 20) -> List[Dict]:
+    """Top-rated books by genre (case-insensitive partial match)."""
+    return [_book_to_dict(b) for b in vector_store.top_rated(genre, limit)]
 
 
-def _get_trending_books(books: Dict[int, BookInDB], limit: int = 20) -> List[Dict]:
+def _get_trending_books(vector_store: VectorStore, limit: int = 20) -> List[Dict]:
     """Get highest rated books as 'trending'."""
-    sorted_books = sorted(books.values(), key=lambda x: x.rating, reverse=True)
-    return [_book_to_dict(b) for b in sorted_books[:limit]]
+    return [_book_to_dict(b) for b in vector_store.top_rated(limit=limit)]
 
 
-def _get_random_hero(books: Dict[int, BookInDB]) -> Optional[Dict]:
+def _get_random_hero(vector_store: VectorStore) -> Optional[Dict]:
     """Get a random high-rated book for hero section."""
-    high_rated = [b for b in books.values() if b.rating >= 4.0]
-    if not high_rated:
-        high_rated = list(books.values())
+    top = vector_store.top_rated(limit=50)  # Pick from top 50
+    high_rated = [b for b in top if b.rating >= 4.0] or top
     if not high_rated:
         return None
     
-    hero = random.choice(high_rated[:50])  # Pick from top 50
+    hero = random.choice(high_rated)
     return _book_to_dict(hero)
 
 
-@router.get("")
+def _build_categories(vector_store: VectorStore, limit: int) -> List[Dict[str, Any]]:
+    """Build the homepage category rows (empty rows dropped)."""
+    # Build category rows in specified order
+    # Build category rows with Kindle-specific genres
+    categories = [
+        {"name": "Trending Now", "books": _get_trending_books(vector_store, limit)},
+        {"name": "Mystery & Thriller", "books": _get_books_by_genre(vector_store, "mystery", limit)},
+        {"name": "Science & Math", "books": _get_books_by_genre(vector_store, "science", limit)},
+        {"name": "Biographies", "books": _get_books_by_genre(vector_store, "biograph", limit)},
+        {"name": "Technology", "books": _get_books_by_genre(vector_store, "technology", limit)},
+        {"name": "Computers", "books": _get_books_by_genre(vector_store, "computer", limit)},
+        {"name": "Parenting", "books": _get_books_by_genre(vector_store, "parenting", limit)},
+        {"name": "Literature & Fiction", "books": _get_books_by_genre(vector_store, "fiction", limit)},
+        {"name": "Teen & Young Adult", "books": _get_books_by_genre(vector_store, "teen", limit)},
+        {"name": "Business & Money", "books": _get_books_by_genre(vector_store, "business", limit)},
+    ]
+    
+    # Filter out empty categories
+    return [c for c in categories if c["books"]]
+
+
+def _get_categories(vector_store: VectorStore, limit: int) -> Tuple[List[Dict[str, Any]], str]:
+    """Category rows plus their ETag, cached until the catalog changes."""
+    key = (limit, vector_store.version)
+    cached = _categories_cache.get(key)
+    if cached is None:
+        categories = _build_categories(vector_store, limit)
+        # Tag from the rows themselves: version restarts with the process
+        # and differs per worker, so it can't identify the content.
+        # Weak: responses with the same rows are equivalent even if the hero differs
+        digest = hashlib.blake2b(orjson.dumps(categories), digest_size=12).hexdigest()
+        cached = (categories, f'W/"{digest}"')
+        _categories_cache[key] = cached
+    return cached
+
+
+@router.get("", response_class=ORJSONResponse)
 async def discover(
     request: Request,
     limit: int = Query(20, ge=1, le=50, description="Books per category")
-) -> Dict[str, Any]:
+) -> Response:
     """
     Get homepage discovery data.
     
+    Sends a weak ETag for the category rows; a matching If-None-Match
+    gets a 304.
+    
     Returns:
         - hero: Featured book for hero section
         - categories: List of genre rows with books
     """
     vector_store = request.app.state.vector_store
-    books = vector_store._books  # Access book mapping
     
-    if not books:
-        return {
+    if not vector_store.size:
+        return ORJSONResponse({
             "hero": None,
             "categories": []
-        }
+        })
     
-    # Build category rows in specified order
-    # Build category rows with Kindle-specific genres
-    categories = [
-        {"name": "Trending Now", "books": _get_trending_books(books, limit)},
-        {"name": "Mystery & Thriller", "books": _get_books_by_genre(books, "mystery", limit)},
-        {"name": "Science & Math", "books": _get_books_by_genre(books, "science", limit)},
-        {"name": "Biographies", "books": _get_books_by_genre(books, "biograph", limit)},
-        {"name": "Technology", "books": _get_books_by_genre(books, "technology", limit)},
-        {"name": "Computers", "books": _get_books_by_genre(books, "computer", limit)},
-        {"name": "Parenting", "books": _get_books_by_genre(books, "parenting", limit)},
-        {"name": "Literature & Fiction", "books": _get_books_by_genre(books, "fiction", limit)},
-        {"name": "Teen & Young Adult", "books": _get_books_by_genre(books, "teen", limit)},
-        {"name": "Business & Money", "books": _get_books_by_genre(books, "business", limit)},
-    ]
-    
-    # Filter out empty categories
-    categories = [c for c in categories if c["books"]]
+    categories, etag = _get_categories(vector_store, limit)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
     
     # Get hero and enrich its description if needed
-    hero = _get_random_hero(books)
+    hero = _get_random_hero(vector_store)
     
     if hero and (not hero.get("description") or len(hero.get("description", "")) < 30):
         # JIT enrich hero description
@@ -113,68 +139,45 @@ async def discover(
             )
             hero["description"] = desc
         except Exception as e:
-            print(f"[Discover] Hero description enrichment failed: {e}")
+            logger.warning("Hero description enrichment failed: %s", e)
     
-    return {
+    # Plain dicts straight to orjson; skips jsonable_encoder on ~200 books
+    return ORJSONResponse({
         "hero": hero,
         "categories": categories
-    }
+    }, headers={"ETag": etag})
 
 
-@router.get("/search")
+@router.get("/search", response_class=ORJSONResponse)
 async def search_discover(
     request: Request,
     q: str = Query(..., min_length=1, description="Search query"),
     limit: int = Query(20, ge=1, le=50)
-) -> Dict[str, Any]:
+) -> ORJSONResponse:
     """
     Search books by title or author.
     
     Simple text search for the search bar (not semantic).
     """
     vector_store = request.app.state.vector_store
-    books = vector_store._books
     
-    q_lower = q.lower()
-    
-    results = [
-        _book_to_dict(b) for b in books.values()
-        if q_lower in b.title.lower() or q_lower in b.author.lower()
-    ]
-    
-    # Sort by rating
-    results.sort(key=lambda x: x["rating"], reverse=True)
-    
-    return {
+    return ORJSONResponse({
         "query": q,
-        "results": results[:limit]
-    }
+        "results": [_book_to_dict(b) for b in vector_store.search_text(q, limit)]
+    })
 
 
-@router.get("/book/{book_id}")
+@router.get("/book/{book_id}", response_class=ORJSONResponse)
 async def get_book(
     request: Request,
     book_id: str
-) -> Dict[str, Any]:
+) -> ORJSONResponse:
     """Get details for a single book by ID."""
     vector_store = request.app.state.vector_store
-    
-    # Try to find book by ID (string or int conversion)
-    book = None
-    if book_id in vector_store._books:
-        book = vector_store._books[book_id]
-    elif book_id.isdigit() and int(book_id) in vector_store._books:
-        book = vector_store._books[int(book_id)]
-        
-    if not book:
-        # Fallback: Search all book values for matching ID field
-        for b in vector_store._books.values():
-            if str(b.id) == str(book_id):
-                book = b
-                break
+    book = vector_store.get_book(book_id)
     
     from fastapi import HTTPException
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
         
-    return _book_to_dict(book)
+    return ORJSONResponse(_book_to_dict(book))
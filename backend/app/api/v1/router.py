@@ -12,34 +12,14 @@ from app.api.v1.endpoints import auth, books, chat, discover, health
 
 api_router = APIRouter()
 
-# Include all endpoint routers with appropriate prefixes and tags
-api_router.include_router(
-    health.router,
-    prefix="/health",
-    tags=["Health"]
-)
-
-api_router.include_router(
-    auth.router,
-    prefix="/auth",
-    tags=["Authentication"]
-)
-
-api_router.include_router(
-    discover.router,
-    prefix="/discover",
-    tags=["Discover"]
-)
-
-api_router.include_router(
-    chat.router,
-    prefix="/chat",
-    tags=["Chat"]
-)
-
-api_router.include_router(
-    books.router,
-    prefix="/books",
-    tags=["Books"]
+# (router, prefix, tag) for each endpoint module, mounted in this order
+_ENDPOINT_ROUTERS = (
+    (health.router, "/health", "Health"),
+    (auth.router, "/auth", "Authentication"),
+    (discover.router, "/discover", "Discover"),
+    (chat.router, "/chat", "Chat"),
+    (books.router, "/books", "Books"),
 )
 
+for router, prefix, tag in _ENDPOINT_ROUTERS:
+    api_router.include_router(router, prefix=prefix, tags=[tag])
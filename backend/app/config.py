@@ -33,6 +33,12 @@ class Settings(BaseSettings):
     
     # Database (PostgreSQL) - Optional for initial scaffold
     database_url: Optional[str] = None
+    db_pool_min_connections: int = 5   # PostgreSQL connections kept open
+    db_pool_max_connections: int = 25  # Callers wait for a free one past this
+    
+    # Redis - Optional; shares anonymous chat sessions across workers
+    redis_url: Optional[str] = None
+    session_ttl_seconds: int = 3600  # Idle anonymous sessions expire after this
     
     # Vector Store Configuration
     faiss_index_path: str = "./data/faiss_index"
@@ -50,9 +56,20 @@ class Settings(BaseSettings):
     # Cache Settings
     cache_ttl_seconds: int = 3600  # 1 hour default TTL
     cache_max_size: int = 1000     # Max cached items
+    cover_cache_ttl_seconds: int = 86400  # Google Books cover hits (covers rarely change)
+    cover_miss_ttl_seconds: int = 3600    # Negative cache for lookups that found no cover
+    recommendation_cache_ttl_seconds: int = 600  # Final chat recommendations (skips rerank LLM)
+    description_miss_ttl_seconds: int = 3600     # Books no source could describe
+    
+    # Max wait for the profile summary before intent analysis proceeds without it
+    profile_summary_wait_seconds: float = 0.15
     
     # Gemini Model (Verified working on free tier)
     gemini_model: str = "gemini-flash-latest"
+    
+    # Admission control: max concurrent calls per backend
+    gemini_max_concurrency: int = 16    # Shared by all Gemini calls (one API quota)
+    embedding_max_concurrency: int = 4  # Local model encodes in the thread pool
 
 
 @lru_cache()
@@ -11,61 +11,316 @@ Uses DATABASE_URL environment variable for connection.
 Falls back to SQLite for local development if DATABASE_URL is not set.
 """
 
+import asyncio
 import os
 import hashlib
-import json
-from typing import Optional, List, Dict, Any
+import hmac
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from itertools import combinations
+from typing import Iterator, Optional, List, Dict, Any
 from datetime import datetime
 
+import orjson
+from cachetools import TTLCache
+
 from app.config import get_settings
 
-# Try PostgreSQL first, fallback to SQLite for local dev
+logger = logging.getLogger(__name__)
+
+# Try PostgreSQL first, fallback to SQLite for local dev.
+# The driver is imported when Database() is constructed, not at module
+# load, so importing the routers doesn't pay for libpq.
 USE_POSTGRES = bool(os.environ.get("DATABASE_URL"))
 
-if USE_POSTGRES:
-    import psycopg2
-    from psycopg2.extras import RealDictCursor
-else:
-    import sqlite3
-    from pathlib import Path
+# Salt for the throwaway hash authenticate_user computes for unknown users
+_DUMMY_SALT = bytes(16)
+
+# Profile columns returned by get_user and friends; the password hash
+# and salt are only read by authenticate_user
+_USER_COLUMNS = "id, username, display_name, theme, personality, favorite_genres, created_at"
+
+# Book columns returned by the book getters (PostgreSQL's books also
+# carries the generated tsv column, which no caller wants back)
+_BOOK_COLUMNS = ("id", "title", "author", "description", "genre", "rating",
+                 "cover_url", "source", "year_published")
+
+# Columns update_user_preferences may set, in statement order
+_PREFERENCE_COLUMNS = ("theme", "personality", "favorite_genres")
+
+# Append-only log tables written behind (see _write_behind_loop)
+_WRITE_BEHIND_TABLES = {
+    "chat_history": ("user_id", "role", "message"),
+    "interactions": ("user_id", "book_id", "action", "rating"),
+    "search_queries": ("user_id", "query"),
+}
+_WRITE_BEHIND_INTERVAL = 0.05  # seconds a batch may wait to fill
+_WRITE_BEHIND_BATCH = 100
 
 
 class Database:
     """Database manager supporting both PostgreSQL (cloud) and SQLite (local)."""
     
-    def __init__(self):
+    # Databases whose schema this process has already set up -> FTS available
+    _schema_ready: Dict[str, bool] = {}
+    
+    def __init__(self, ensure_schema: bool = True):
+        """
+        Set up connection handling. Pass ensure_schema=False to skip DDL
+        (e.g. scripts against an existing database); see ensure_schema().
+        """
         self.use_postgres = USE_POSTGRES
         
+        # Hot user rows (user_id -> parsed user dict); invalidated on update.
+        # The TTL bounds staleness from writes by other worker processes.
+        # cachetools caches aren't thread-safe and the DB is used from
+        # worker threads, so both caches go through _cache_lock.
+        settings = get_settings()
+        self._user_cache: TTLCache = TTLCache(
+            maxsize=settings.cache_max_size, ttl=settings.cache_ttl_seconds
+        )
+        # user_id -> set of book_ids in their reading list; kept current
+        # by add/remove, refreshed from the DB at most once a minute
+        self._reading_list_cache: TTLCache = TTLCache(
+            maxsize=settings.cache_max_size, ttl=60
+        )
+        # Per-user profile reads done on every logged-in chat turn:
+        # user_id -> insight rows, and user_id -> {limit: read history}.
+        # Dropped when the user's insights/interactions are written.
+        self._insights_cache: TTLCache = TTLCache(
+            maxsize=settings.cache_max_size, ttl=60
+        )
+        self._read_history_cache: TTLCache = TTLCache(
+            maxsize=settings.cache_max_size, ttl=60
+        )
+        self._cache_lock = threading.RLock()
+        
+        # One long-lived SQLite connection per thread (see _get_connection)
+        self._local = threading.local()
+        
+        # Set by _init_tables when SQLite has the FTS5 trigram tokenizer
+        self._books_fts = False
+        
+        # Log-table rows (table, params) waiting for the writer thread,
+        # which is started on first use
+        self._write_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        
         if self.use_postgres:
             self.database_url = os.environ.get("DATABASE_URL")
             # Handle Render's postgres:// vs postgresql:// format
             if self.database_url.startswith("postgres://"):
                 self.database_url = self.database_url.replace("postgres://", "postgresql://", 1)
-            print(f"[Database] Using PostgreSQL")
+            logger.debug("Using PostgreSQL")
+            import psycopg2.pool
+            from psycopg2.extras import RealDictCursor, execute_values
+            self._RealDictCursor = RealDictCursor
+            self._execute_values = execute_values
+            # Reuse connections instead of a TCP/TLS/auth handshake per query.
+            # The pool raises when exhausted, so callers queue on a semaphore.
+            self._pool = psycopg2.pool.ThreadedConnectionPool(
+                settings.db_pool_min_connections,
+                settings.db_pool_max_connections,
+                dsn=self.database_url
+            )
+            self._pool_slots = threading.BoundedSemaphore(settings.db_pool_max_connections)
         else:
-            settings = get_settings()
+            import sqlite3
             from pathlib import Path
+            self._sqlite3 = sqlite3
             db_path = Path(settings.faiss_index_path).parent / "bookai.db"
             db_path.parent.mkdir(parents=True, exist_ok=True)
             self.db_path = str(db_path)
-            print(f"[Database] Using SQLite: {self.db_path}")
+            logger.debug("Using SQLite: %s", self.db_path)
         
+        # One fixed UPDATE per non-empty subset of _PREFERENCE_COLUMNS, so
+        # the SQL text (and SQLite's statement cache entry) is stable
+        p = self._placeholder()
+        self._preference_updates: Dict[tuple, str] = {
+            cols: f"UPDATE users SET {', '.join(f'{c} = {p}' for c in cols)} WHERE id = {p} RETURNING {_USER_COLUMNS}"
+            for n in range(1, len(_PREFERENCE_COLUMNS) + 1)
+            for cols in combinations(_PREFERENCE_COLUMNS, n)
+        }
+        
+        if ensure_schema:
+            self.ensure_schema()
+    
+    def ensure_schema(self):
+        """Create missing tables and indexes (idempotent; once per process)."""
         self._init_tables()
     
     def _get_connection(self):
-        """Get database connection."""
+        """
+        Get database connection.
+        
+        PostgreSQL: a connection from the shared pool (blocks while all
+        are checked out).
+        SQLite: a per-thread connection opened once and kept for the
+        process lifetime (WAL mode, so readers don't block the writer).
+        Always hand it back with _release_connection(), never close().
+        """
         if self.use_postgres:
-            conn = psycopg2.connect(self.database_url)
-            return conn
+            self._pool_slots.acquire()
+            try:
+                return self._pool.getconn()
+            except Exception:
+                self._pool_slots.release()
+                raise
         else:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                # Statements are cached by SQL text, so the fixed queries
+                # below are prepared once per connection
+                conn = self._sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+                conn.row_factory = self._sqlite3.Row
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA temp_store=MEMORY")
+                conn.execute("PRAGMA mmap_size=268435456")  # 256 MB read mapping
+                conn.execute("PRAGMA cache_size=-65536")  # 64 MB page cache (default ~2 MB)
+                self._local.conn = conn
             return conn
     
-    def _get_cursor(self, conn):
-        """Get cursor with appropriate row factory."""
+    def _release_connection(self, conn):
+        """Release a connection from _get_connection()."""
+        if self.use_postgres:
+            # putconn rolls back an open transaction; drop broken connections
+            self._pool.putconn(conn, close=bool(conn.closed))
+            self._pool_slots.release()
+        elif conn.in_transaction:
+            # Never leave the shared SQLite connection mid-transaction
+            # (e.g. after a failed INSERT) holding the write lock.
+            conn.rollback()
+    
+    def close(self):
+        """Write out queued log rows, then close pooled PostgreSQL connections (shutdown)."""
+        if self._writer is not None:
+            self.flush_writes()
+        if self.use_postgres:
+            self._pool.closeall()
+    
+    # ============ WRITE-BEHIND LOGGING ============
+    
+    def _enqueue_write(self, table: str, params: tuple):
+        """Queue a row for one of _WRITE_BEHIND_TABLES; returns immediately."""
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(
+                        target=self._write_behind_loop, name="db-write-behind", daemon=True
+                    )
+                    self._writer.start()
+        self._write_queue.put((table, params))
+    
+    def flush_writes(self):
+        """Block until every row queued so far has been written (and committed)."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._write_queue.put(done)
+        done.wait()
+    
+    def _write_behind_loop(self):
+        """
+        Writer thread: collect queued rows for up to _WRITE_BEHIND_INTERVAL
+        (or _WRITE_BEHIND_BATCH rows), then insert them with one statement
+        per table and a single commit. Rows are written in queue order, so
+        ids (and history order) follow call order.
+        """
+        while True:
+            batch = [self._write_queue.get()]
+            deadline = time.monotonic() + _WRITE_BEHIND_INTERVAL
+            while len(batch) < _WRITE_BEHIND_BATCH and not isinstance(batch[-1], threading.Event):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            rows: Dict[str, List[tuple]] = {}
+            barriers = []
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    barriers.append(item)
+                else:
+                    rows.setdefault(item[0], []).append(item[1])
+            if rows:
+                self._write_batch(rows)
+            for barrier in barriers:
+                barrier.set()
+    
+    def _write_batch(self, rows: Dict[str, List[tuple]]):
+        """Insert a batch in one transaction; on failure fall back to row by row."""
+        try:
+            with self.cursor() as cursor:
+                for table, params in rows.items():
+                    self._insert_many(cursor, table, params)
+        except Exception as e:
+            logger.warning("Batched log write failed, retrying rows one by one: %s", e)
+            for table, params in rows.items():
+                for row in params:
+                    try:
+                        with self.cursor() as cursor:
+                            self._insert_many(cursor, table, [row])
+                    except Exception as e:
+                        logger.error("Dropped %s row: %s", table, e)
+        
+        # Read history is derived from interactions; drop it only once the
+        # rows are visible so a concurrent read can't re-cache stale data
+        if "interactions" in rows:
+            with self._cache_lock:
+                for row in rows["interactions"]:
+                    self._read_history_cache.pop(row[0], None)
+    
+    def _insert_many(self, cursor, table: str, params: List[tuple]):
+        """Multi-row INSERT into a write-behind table."""
+        columns = _WRITE_BEHIND_TABLES[table]
         if self.use_postgres:
-            return conn.cursor(cursor_factory=RealDictCursor)
+            self._execute_values(
+                cursor, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s", params
+            )
+        else:
+            placeholders = ", ".join("?" * len(columns))
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", params
+            )
+    
+    @contextmanager
+    def cursor(self, dict_rows: bool = True) -> Iterator[Any]:
+        """
+        Context-managed cursor: commits on success, rolls back on error,
+        and always hands the connection back (see _get_cursor for dict_rows).
+        
+        Usage:
+            with db.cursor() as cur:
+                cur.execute(...)
+        """
+        conn = self._get_connection()
+        try:
+            yield self._get_cursor(conn, dict_rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._release_connection(conn)
+    
+    def _get_cursor(self, conn, dict_rows: bool = True):
+        """
+        Get cursor with appropriate row factory.
+        
+        dict_rows=False gives PostgreSQL plain tuple rows (no per-row dict)
+        for fixed-shape hot queries that unpack by position; SQLite rows
+        support both access styles either way.
+        """
+        if self.use_postgres and dict_rows:
+            return conn.cursor(cursor_factory=self._RealDictCursor)
         else:
             return conn.cursor()
     
@@ -74,19 +329,27 @@ class Database:
         return "%s" if self.use_postgres else "?"
     
     def _init_tables(self):
-        """Initialize database tables."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
+        """
+        Initialize database tables.
         
-        p = self._placeholder()
+        All DDL goes to the server as one script in one transaction (one
+        round-trip on PostgreSQL), and only once per database per process.
+        """
+        target = self.database_url if self.use_postgres else self.db_path
+        if target in Database._schema_ready:
+            self._books_fts = Database._schema_ready[target]
+            return
+        
+        ddl: List[str] = []
         
         if self.use_postgres:
             # PostgreSQL schema
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS users (
                     id SERIAL PRIMARY KEY,
                     username TEXT UNIQUE NOT NULL,
                     password_hash TEXT NOT NULL,
+                    password_salt TEXT,
                     display_name TEXT,
                     theme TEXT DEFAULT 'dark',
                     personality TEXT DEFAULT 'friendly',
@@ -94,8 +357,9 @@ class Database:
                     created_at TIMESTAMP DEFAULT NOW()
                 )
             """)
+            ddl.append("ALTER TABLE users ADD COLUMN IF NOT EXISTS password_salt TEXT")
             
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS chat_history (
                     id SERIAL PRIMARY KEY,
                     user_id INTEGER NOT NULL,
@@ -106,7 +370,7 @@ class Database:
                 )
             """)
             
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS user_insights (
                     id SERIAL PRIMARY KEY,
                     user_id INTEGER NOT NULL,
@@ -117,18 +381,33 @@ class Database:
                 )
             """)
             
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS interactions (
                     id SERIAL PRIMARY KEY,
                     user_id INTEGER NOT NULL,
                     book_id TEXT NOT NULL,
                     action TEXT NOT NULL,
+                    rating REAL,
                     timestamp TIMESTAMP DEFAULT NOW(),
                     FOREIGN KEY (user_id) REFERENCES users(id)
                 )
             """)
+            # Ratings used to be folded into action ("rate_4.0"); move them
+            # into the typed column once, when the column is added
+            ddl.append("""
+                DO $$ BEGIN
+                    IF NOT EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'interactions' AND column_name = 'rating'
+                    ) THEN
+                        ALTER TABLE interactions ADD COLUMN rating REAL;
+                        UPDATE interactions SET rating = substr(action, 6)::REAL, action = 'rate'
+                        WHERE action ~ '^rate_[0-9]+([.][0-9]+)?$';
+                    END IF;
+                END $$
+            """)
             
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS books (
                     id TEXT PRIMARY KEY,
                     title TEXT NOT NULL,
@@ -142,8 +421,17 @@ class Database:
                     created_at TIMESTAMP DEFAULT NOW()
                 )
             """)
+            # Full-text search for search_books_sql (GIN index instead of
+            # a sequential ILIKE '%q%' scan)
+            ddl.append("""
+                ALTER TABLE books ADD COLUMN IF NOT EXISTS tsv tsvector
+                GENERATED ALWAYS AS (
+                    to_tsvector('english', coalesce(title, '') || ' ' || coalesce(author, ''))
+                ) STORED
+            """)
+            ddl.append("CREATE INDEX IF NOT EXISTS idx_books_tsv ON books USING GIN (tsv)")
             
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS reading_list (
                     id SERIAL PRIMARY KEY,
                     user_id INTEGER NOT NULL,
@@ -154,7 +442,17 @@ class Database:
                 )
             """)
             
-            cursor.execute("""
+            ddl.append("""
+                CREATE TABLE IF NOT EXISTS chat_summaries (
+                    user_id INTEGER PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    message_count INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT NOW(),
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            """)
+            
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS search_queries (
                     id SERIAL PRIMARY KEY,
                     user_id INTEGER NOT NULL,
@@ -165,16 +463,18 @@ class Database:
             """)
             
             # Create indexes
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_title ON books(title)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_search_user ON search_queries(user_id)")
+            ddl.append("CREATE INDEX IF NOT EXISTS idx_books_title ON books(title)")
+            ddl.append("CREATE INDEX IF NOT EXISTS idx_books_genre_rating_id ON books(genre, rating, id)")
+            self._create_user_indexes(ddl)
             
         else:
             # SQLite schema (original)
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS users (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     username TEXT UNIQUE NOT NULL,
                     password_hash TEXT NOT NULL,
+                    password_salt TEXT,
                     display_name TEXT,
                     theme TEXT DEFAULT 'dark',
                     personality TEXT DEFAULT 'friendly',
@@ -183,7 +483,7 @@ class Database:
                 )
             """)
             
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS chat_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER NOT NULL,
@@ -194,7 +494,7 @@ class Database:
                 )
             """)
             
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS user_insights (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER NOT NULL,
@@ -205,18 +505,19 @@ class Database:
                 )
             """)
             
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS interactions (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER NOT NULL,
                     book_id TEXT NOT NULL,
                     action TEXT NOT NULL,
+                    rating REAL,
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (user_id) REFERENCES users(id)
                 )
             """)
             
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS books (
                     id TEXT PRIMARY KEY,
                     title TEXT NOT NULL,
@@ -230,9 +531,10 @@ class Database:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_books_title ON books(title)")
+            ddl.append("CREATE INDEX IF NOT EXISTS idx_books_title ON books(title)")
+            ddl.append("CREATE INDEX IF NOT EXISTS idx_books_genre_rating_id ON books(genre, rating, id)")
             
-            cursor.execute("""
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS reading_list (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER NOT NULL,
@@ -243,7 +545,17 @@ class Database:
                 )
             """)
             
-            cursor.execute("""
+            ddl.append("""
+                CREATE TABLE IF NOT EXISTS chat_summaries (
+                    user_id INTEGER PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    message_count INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users(id)
+                )
+            """)
+            
+            ddl.append("""
                 CREATE TABLE IF NOT EXISTS search_queries (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER NOT NULL,
@@ -252,155 +564,394 @@ class Database:
                     FOREIGN KEY (user_id) REFERENCES users(id)
                 )
             """)
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_search_user ON search_queries(user_id)")
+            self._create_user_indexes(ddl)
         
-        conn.commit()
-        conn.close()
+        script = ";\n".join(ddl)
+        with self.cursor() as cursor:
+            if self.use_postgres:
+                cursor.execute(script)
+            else:
+                # Before the script: its indexes may use the new columns
+                self._migrate_sqlite_columns(cursor)
+                cursor.connection.executescript(f"BEGIN;\n{script};\nCOMMIT;")
+                self._books_fts = self._init_books_fts(cursor)
+        Database._schema_ready[target] = self._books_fts
+    
+    def _migrate_sqlite_columns(self, cursor):
+        """
+        Add columns newer than an existing SQLite database (SQLite has no
+        ADD COLUMN IF NOT EXISTS). Tables that don't exist yet are skipped;
+        the CREATE TABLEs already include the columns.
+        """
+        cursor.execute("PRAGMA table_info(users)")
+        columns = {row["name"] for row in cursor.fetchall()}
+        if columns and "password_salt" not in columns:
+            cursor.execute("ALTER TABLE users ADD COLUMN password_salt TEXT")
+        
+        cursor.execute("PRAGMA table_info(interactions)")
+        columns = {row["name"] for row in cursor.fetchall()}
+        if columns and "rating" not in columns:
+            cursor.execute("ALTER TABLE interactions ADD COLUMN rating REAL")
+            # Ratings used to be folded into action ("rate_4.0")
+            cursor.execute("""
+                UPDATE interactions SET rating = CAST(substr(action, 6) AS REAL), action = 'rate'
+                WHERE action GLOB 'rate_[0-9]*'
+            """)
+    
+    def _create_user_indexes(self, ddl: List[str]):
+        """Per-user lookups on the /chat path: newest-first by user_id."""
+        ddl.append("CREATE INDEX IF NOT EXISTS idx_chat_user_time ON chat_history(user_id, timestamp, id)")
+        ddl.append("CREATE INDEX IF NOT EXISTS idx_insights_user ON user_insights(user_id)")
+        ddl.append("CREATE INDEX IF NOT EXISTS idx_interactions_user_time ON interactions(user_id, timestamp)")
+        # get_user_interactions(action=...): equality on both, newest first
+        ddl.append("CREATE INDEX IF NOT EXISTS idx_interactions_user_action_time ON interactions(user_id, action, timestamp)")
+        # Partial index matching get_user_read_history's filter
+        # (supersedes idx_interactions_user_read_time on action LIKE 'rate_%')
+        ddl.append("DROP INDEX IF EXISTS idx_interactions_user_read_time")
+        ddl.append(
+            "CREATE INDEX IF NOT EXISTS idx_interactions_user_read_rated ON interactions(user_id, timestamp) "
+            "WHERE action = 'read' OR rating IS NOT NULL"
+        )
+        # Supersedes the old single-column idx_search_user
+        ddl.append("DROP INDEX IF EXISTS idx_search_user")
+        ddl.append("CREATE INDEX IF NOT EXISTS idx_search_user_time ON search_queries(user_id, timestamp)")
+        # get_reading_list: walked backwards for ORDER BY added_at DESC, no sort
+        ddl.append("CREATE INDEX IF NOT EXISTS idx_reading_list_user_added ON reading_list(user_id, added_at)")
+    
+    def _init_books_fts(self, cursor) -> bool:
+        """
+        Create the trigram FTS5 index over book titles/authors (SQLite).
+        
+        Kept in sync with books by triggers. Returns False when this SQLite
+        build lacks FTS5 or the trigram tokenizer; search_books_sql then
+        keeps using LIKE.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'books_fts'")
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+                    title, author, content='books', content_rowid='rowid', tokenize='trigram'
+                )
+            """)
+        except self._sqlite3.OperationalError as e:
+            logger.warning("FTS5 trigram index unavailable, using LIKE search: %s", e)
+            return False
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+                INSERT INTO books_fts(rowid, title, author) VALUES (new.rowid, new.title, new.author);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+                INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.rowid, old.title, old.author);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE ON books BEGIN
+                INSERT INTO books_fts(books_fts, rowid, title, author) VALUES ('delete', old.rowid, old.title, old.author);
+                INSERT INTO books_fts(rowid, title, author) VALUES (new.rowid, new.title, new.author);
+            END
+        """)
+        if not exists:
+            # Index books stored before the FTS table existed
+            cursor.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+        return True
     
     # ============ USER METHODS ============
     
-    def _hash_password(self, password: str) -> str:
-        """Hash password with SHA256."""
-        return hashlib.sha256(password.encode()).hexdigest()
+    def _row_to_user(self, row) -> Dict:
+        """
+        Convert a users row to a dict with favorite_genres parsed once.
+        
+        The column stays JSON TEXT (portable across SQLite/PostgreSQL and
+        existing databases); orjson decodes it several times faster.
+        """
+        user = dict(row)
+        genres = user.get("favorite_genres")
+        user["favorite_genres"] = orjson.loads(genres) if genres else []
+        return user
+    
+    def _hash_password(self, password: str, salt: bytes) -> str:
+        """Hash password with scrypt (memory-hard, per-user salt)."""
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=2**14, r=8, p=1,
+            maxmem=64 * 1024 * 1024, dklen=32
+        ).hex()
+    
+    def _check_password(self, user: Dict, password: str) -> bool:
+        """
+        Constant-time password check.
+        
+        Rows without a salt were created with unsalted SHA256; they still
+        verify so authenticate_user can upgrade them to scrypt.
+        """
+        salt = user.get("password_salt")
+        if salt:
+            computed = self._hash_password(password, bytes.fromhex(salt))
+        else:
+            computed = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(user["password_hash"], computed)
     
     def create_user(self, username: str, password: str, display_name: str = None) -> Optional[int]:
         """Create a new user. Returns user_id or None if username exists."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
         p = self._placeholder()
+        salt = os.urandom(16)
+        password_hash = self._hash_password(password, salt)
         
         try:
-            cursor.execute(
-                f"INSERT INTO users (username, password_hash, display_name) VALUES ({p}, {p}, {p}) RETURNING id" if self.use_postgres else
-                f"INSERT INTO users (username, password_hash, display_name) VALUES ({p}, {p}, {p})",
-                (username.lower(), self._hash_password(password), display_name or username)
-            )
-            conn.commit()
-            
-            if self.use_postgres:
+            # RETURNING works on both backends (SQLite 3.35+)
+            with self.cursor(dict_rows=False) as cursor:
+                cursor.execute(
+                    f"INSERT INTO users (username, password_hash, password_salt, display_name) VALUES ({p}, {p}, {p}, {p}) RETURNING id",
+                    (username.lower(), password_hash, salt.hex(), display_name or username)
+                )
                 result = cursor.fetchone()
-                user_id = result['id'] if result else None
-            else:
-                user_id = cursor.lastrowid
-            
-            conn.close()
-            return user_id
+            return result[0] if result else None
         except Exception as e:
-            print(f"[Database] Create user error: {e}")
-            conn.close()
+            # Usually the UNIQUE username constraint; no traceback needed
+            logger.info("Create user failed: %s", e)
             return None
     
     def authenticate_user(self, username: str, password: str) -> Optional[Dict]:
-        """Authenticate user. Returns user dict or None."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
+        """
+        Authenticate user. Returns user dict or None.
+        
+        Looks the user up by username and compares hashes in Python
+        (constant time) rather than matching the hash in SQL. Unknown
+        usernames still pay for one scrypt, so response time doesn't
+        reveal which usernames exist. scrypt costs tens of ms of CPU, so
+        call this off the event loop.
+        """
         p = self._placeholder()
         
-        cursor.execute(
-            f"SELECT * FROM users WHERE username = {p} AND password_hash = {p}",
-            (username.lower(), self._hash_password(password))
-        )
-        row = cursor.fetchone()
-        conn.close()
+        with self.cursor() as cursor:
+            cursor.execute(f"SELECT {_USER_COLUMNS}, password_hash, password_salt FROM users WHERE username = {p}", (username.lower(),))
+            row = cursor.fetchone()
+        if not row:
+            self._hash_password(password, _DUMMY_SALT)
+            return None
         
-        if row:
-            return dict(row)
-        return None
+        user = self._row_to_user(row)
+        if not self._check_password(user, password):
+            return None
+        
+        if not user.get("password_salt"):
+            # Legacy SHA256 row: re-hash with scrypt now that we have the password
+            salt = os.urandom(16)
+            user["password_hash"] = self._hash_password(password, salt)
+            user["password_salt"] = salt.hex()
+            with self.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE users SET password_hash = {p}, password_salt = {p} WHERE id = {p}",
+                    (user["password_hash"], user["password_salt"], user["id"])
+                )
+            with self._cache_lock:
+                self._user_cache.pop(user["id"], None)
+        return user
     
     def get_user(self, user_id: int) -> Optional[Dict]:
-        """Get user by ID."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
+        """Get user by ID (served from the in-process TTL cache when hot)."""
+        with self._cache_lock:
+            cached = self._user_cache.get(user_id)
+        if cached is not None:
+            return dict(cached)
+        
         p = self._placeholder()
+        with self.cursor() as cursor:
+            cursor.execute(f"SELECT {_USER_COLUMNS} FROM users WHERE id = {p}", (user_id,))
+            row = cursor.fetchone()
         
-        cursor.execute(f"SELECT * FROM users WHERE id = {p}", (user_id,))
-        row = cursor.fetchone()
-        conn.close()
-        return dict(row) if row else None
+        if not row:
+            return None
+        user = self._row_to_user(row)
+        with self._cache_lock:
+            self._user_cache[user_id] = user
+        return dict(user)
     
     def update_user_preferences(self, user_id: int, theme: str = None, 
-                                 personality: str = None, favorite_genres: List[str] = None):
-        """Update user preferences."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
-        p = self._placeholder()
-        
-        updates = []
-        values = []
+                                 personality: str = None, favorite_genres: List[str] = None) -> Optional[Dict]:
+        """
+        Update user preferences.
         
+        Uses UPDATE ... RETURNING so the updated row comes back in the same
+        round-trip. Returns the updated user dict, or None if no such user.
+        Values that match the cached row are dropped; if nothing changes,
+        no UPDATE is issued.
+        """
+        requested = {}
         if theme:
-            updates.append(f"theme = {p}")
-            values.append(theme)
+            requested["theme"] = theme
         if personality:
-            updates.append(f"personality = {p}")
-            values.append(personality)
+            requested["personality"] = personality
         if favorite_genres is not None:
-            updates.append(f"favorite_genres = {p}")
-            values.append(json.dumps(favorite_genres))
+            requested["favorite_genres"] = favorite_genres
         
-        if updates:
-            values.append(user_id)
-            cursor.execute(f"UPDATE users SET {', '.join(updates)} WHERE id = {p}", values)
-            conn.commit()
+        with self._cache_lock:
+            cached = self._user_cache.get(user_id)
+        if cached is not None:
+            requested = {c: v for c, v in requested.items() if cached.get(c) != v}
         
-        conn.close()
+        if not requested:
+            return self.get_user(user_id)
+        
+        cols = tuple(c for c in _PREFERENCE_COLUMNS if c in requested)
+        values = [
+            orjson.dumps(requested[c]).decode() if c == "favorite_genres" else requested[c]
+            for c in cols
+        ]
+        values.append(user_id)
+        
+        with self.cursor() as cursor:
+            cursor.execute(self._preference_updates[cols], values)
+            row = cursor.fetchone()
+        
+        with self._cache_lock:
+            if not row:
+                self._user_cache.pop(user_id, None)
+                return None
+            user = self._row_to_user(row)
+            self._user_cache[user_id] = user
+        return dict(user)
     
     # ============ CHAT HISTORY METHODS ============
     
     def add_chat_message(self, user_id: int, role: str, message: str):
-        """Add a chat message to history."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
-        p = self._placeholder()
+        """
+        Add a chat message to history.
         
-        cursor.execute(
-            f"INSERT INTO chat_history (user_id, role, message) VALUES ({p}, {p}, {p})",
-            (user_id, role, message)
-        )
-        conn.commit()
-        conn.close()
+        Written behind (batched within ~50 ms); call flush_writes() before
+        reading history that must include it.
+        """
+        self._enqueue_write("chat_history", (user_id, role, message))
     
     def get_chat_history(self, user_id: int, limit: int = 20) -> List[Dict]:
         """Get recent chat history for a user."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
         p = self._placeholder()
+        with self.cursor(dict_rows=False) as cursor:
+            cursor.execute(
+                f"SELECT role, message, timestamp FROM chat_history WHERE user_id = {p} ORDER BY timestamp DESC, id DESC LIMIT {p}",
+                (user_id, limit)
+            )
+            rows = cursor.fetchall()
+        return [
+            {"role": role, "message": message, "timestamp": timestamp}
+            for role, message, timestamp in reversed(rows)
+        ]
+    
+    def get_user_bundle(self, user_id: int, history_limit: int = 20) -> Optional[Dict]:
+        """
+        Get a user plus recent chat history, insights and chat summary on
+        one connection.
+        
+        History, insights and summary come back from a single UNION ALL
+        query; the user row is served from the LRU when hot. Returns None if
+        no such user, else {"user", "chat_history", "insights", "chat_summary"}
+        shaped like get_user / get_chat_history / get_user_insights.
+        """
+        user = self.get_user(user_id)
+        if not user:
+            return None
+        
+        p = self._placeholder()
+        with self.cursor(dict_rows=False) as cursor:
+            cursor.execute(f"""
+                SELECT 'h' AS kind, id, role AS label, message AS body, timestamp AS ts
+                FROM (
+                    SELECT id, role, message, timestamp FROM chat_history
+                    WHERE user_id = {p} ORDER BY timestamp DESC, id DESC LIMIT {p}
+                ) recent
+                UNION ALL
+                SELECT 'i' AS kind, id, category AS label, insight AS body, created_at AS ts
+                FROM user_insights WHERE user_id = {p}
+                UNION ALL
+                SELECT 's' AS kind, 0 AS id, '' AS label, summary AS body, updated_at AS ts
+                FROM chat_summaries WHERE user_id = {p}
+                ORDER BY kind, ts, id
+            """, (user_id, history_limit, user_id, user_id))
+            rows = cursor.fetchall()
         
-        cursor.execute(
-            f"SELECT role, message, timestamp FROM chat_history WHERE user_id = {p} ORDER BY timestamp DESC LIMIT {p}",
-            (user_id, limit)
-        )
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in reversed(rows)]
+        chat_history = []
+        insights = []
+        chat_summary = ""
+        for kind, _, label, body, ts in rows:
+            if kind == "h":
+                chat_history.append({"role": label, "message": body, "timestamp": ts})
+            elif kind == "i":
+                insights.append({"insight": body, "category": label, "created_at": ts})
+            else:
+                chat_summary = body
+        
+        return {"user": user, "chat_history": chat_history, "insights": insights, "chat_summary": chat_summary}
+    
+    def get_chat_summary_state(self, user_id: int) -> Dict:
+        """
+        Get the stored rolling chat summary and how far it reaches.
+        
+        Returns {"total": messages stored, "summary": text or "",
+        "message_count": total when the summary was last written (0 if none)}.
+        """
+        p = self._placeholder()
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT
+                    (SELECT COUNT(*) FROM chat_history WHERE user_id = {p}) AS total,
+                    s.summary, s.message_count
+                FROM (SELECT 1 AS one) base
+                LEFT JOIN chat_summaries s ON s.user_id = {p}
+            """, (user_id, user_id))
+            row = cursor.fetchone()
+        
+        return {
+            "total": row["total"],
+            "summary": row["summary"] or "",
+            "message_count": row["message_count"] or 0
+        }
+    
+    def set_chat_summary(self, user_id: int, summary: str, message_count: int):
+        """Store the rolling chat summary, covering the first message_count messages."""
+        p = self._placeholder()
+        now = "NOW()" if self.use_postgres else "CURRENT_TIMESTAMP"
+        
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO chat_summaries (user_id, summary, message_count) VALUES ({p}, {p}, {p})
+                ON CONFLICT (user_id) DO UPDATE SET
+                    summary = excluded.summary,
+                    message_count = excluded.message_count,
+                    updated_at = {now}
+            """, (user_id, summary, message_count))
     
     # ============ READER INSIGHTS METHODS ============
     
     def add_user_insight(self, user_id: int, insight: str, category: str = "general"):
         """Store an insight about the user learned by the AI."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
         p = self._placeholder()
-        
-        cursor.execute(
-            f"INSERT INTO user_insights (user_id, insight, category) VALUES ({p}, {p}, {p})",
-            (user_id, insight, category)
-        )
-        conn.commit()
-        conn.close()
+        with self.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO user_insights (user_id, insight, category) VALUES ({p}, {p}, {p})",
+                (user_id, insight, category)
+            )
+        with self._cache_lock:
+            self._insights_cache.pop(user_id, None)
     
     def get_user_insights(self, user_id: int) -> List[Dict]:
         """Get all insights about a user."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
-        p = self._placeholder()
+        with self._cache_lock:
+            cached = self._insights_cache.get(user_id)
+        if cached is not None:
+            return [dict(row) for row in cached]
         
-        cursor.execute(
-            f"SELECT insight, category, created_at FROM user_insights WHERE user_id = {p}",
-            (user_id,)
-        )
-        rows = cursor.fetchall()
-        conn.close()
+        p = self._placeholder()
+        with self.cursor() as cursor:
+            cursor.execute(
+                f"SELECT insight, category, created_at FROM user_insights WHERE user_id = {p}",
+                (user_id,)
+            )
+            rows = [dict(row) for row in cursor.fetchall()]
+        with self._cache_lock:
+            self._insights_cache[user_id] = rows
         return [dict(row) for row in rows]
     
     # ============ BOOK METHODS ============
@@ -411,283 +962,380 @@ class Database:
 
     def add_book(self, book_data: Dict[str, Any]) -> bool:
         """Add or update a book in the persistent DB."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
+        return self.add_books([book_data])
+
+    def add_books(self, books: List[Dict[str, Any]]) -> bool:
+        """Add or update several books in one statement and commit."""
+        if not books:
+            return True
+        
         p = self._placeholder()
+        rows = [
+            (
+                book_data['id'],
+                book_data['title'],
+                book_data.get('author', 'Unknown'),
+                book_data.get('description', ''),
+                book_data.get('genre', 'General'),
+                book_data.get('rating', 0.0),
+                book_data.get('cover_url'),
+                book_data.get('source', 'local'),
+                book_data.get('year_published')
+            )
+            for book_data in books
+        ]
         
         try:
-            if self.use_postgres:
-                cursor.execute(f"""
-                    INSERT INTO books (id, title, author, description, genre, rating, cover_url, source, year_published)
-                    VALUES ({p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p})
-                    ON CONFLICT (id) DO UPDATE SET
-                        title = EXCLUDED.title,
-                        author = EXCLUDED.author,
-                        description = EXCLUDED.description,
-                        genre = EXCLUDED.genre,
-                        rating = EXCLUDED.rating,
-                        cover_url = EXCLUDED.cover_url,
-                        source = EXCLUDED.source,
-                        year_published = EXCLUDED.year_published
-                """, (
-                    book_data['id'],
-                    book_data['title'],
-                    book_data.get('author', 'Unknown'),
-                    book_data.get('description', ''),
-                    book_data.get('genre', 'General'),
-                    book_data.get('rating', 0.0),
-                    book_data.get('cover_url'),
-                    book_data.get('source', 'local'),
-                    book_data.get('year_published')
-                ))
-            else:
-                cursor.execute(f"""
-                    INSERT OR REPLACE INTO books 
-                    (id, title, author, description, genre, rating, cover_url, source, year_published)
-                    VALUES ({p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p})
-                """, (
-                    book_data['id'],
-                    book_data['title'],
-                    book_data.get('author', 'Unknown'),
-                    book_data.get('description', ''),
-                    book_data.get('genre', 'General'),
-                    book_data.get('rating', 0.0),
-                    book_data.get('cover_url'),
-                    book_data.get('source', 'local'),
-                    book_data.get('year_published')
-                ))
-            conn.commit()
+            with self.cursor() as cursor:
+                if self.use_postgres:
+                    # psycopg2's executemany is one round-trip per row; send
+                    # multi-row VALUES lists in pages of 500 instead. One
+                    # statement can't upsert the same id twice, so keep the last.
+                    rows = list({row[0]: row for row in rows}.values())
+                    self._execute_values(cursor, """
+                        INSERT INTO books (id, title, author, description, genre, rating, cover_url, source, year_published)
+                        VALUES %s
+                        ON CONFLICT (id) DO UPDATE SET
+                            title = EXCLUDED.title,
+                            author = EXCLUDED.author,
+                            description = EXCLUDED.description,
+                            genre = EXCLUDED.genre,
+                            rating = EXCLUDED.rating,
+                            cover_url = EXCLUDED.cover_url,
+                            source = EXCLUDED.source,
+                            year_published = EXCLUDED.year_published
+                    """, rows, page_size=500)
+                else:
+                    # Upsert rather than INSERT OR REPLACE: REPLACE's implicit
+                    # delete doesn't fire the books_fts triggers
+                    cursor.executemany(f"""
+                        INSERT INTO books 
+                        (id, title, author, description, genre, rating, cover_url, source, year_published)
+                        VALUES ({p}, {p}, {p}, {p}, {p}, {p}, {p}, {p}, {p})
+                        ON CONFLICT (id) DO UPDATE SET
+                            title = excluded.title,
+                            author = excluded.author,
+                            description = excluded.description,
+                            genre = excluded.genre,
+                            rating = excluded.rating,
+                            cover_url = excluded.cover_url,
+                            source = excluded.source,
+                            year_published = excluded.year_published
+                    """, rows)
             return True
-        except Exception as e:
-            print(f"DB Error adding book: {e}")
+        except Exception:
+            logger.exception("Failed to add books")
             return False
-        finally:
-            conn.close()
 
     def get_book_by_title(self, title: str) -> Optional[Dict]:
         """Case-insensitive title match lookup."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
         p = self._placeholder()
+        columns = ", ".join(_BOOK_COLUMNS)
+        with self.cursor() as cursor:
+            if self.use_postgres:
+                cursor.execute(f"SELECT {columns} FROM books WHERE LOWER(title) = LOWER({p})", (title,))
+            else:
+                cursor.execute(f"SELECT {columns} FROM books WHERE title = {p} COLLATE NOCASE", (title,))
+            row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def list_books(self, after_id: Optional[str] = None, limit: int = 20,
+                   genre: Optional[str] = None, min_rating: Optional[float] = None) -> List[Dict]:
+        """
+        Keyset-paginated catalog listing ordered by ID.
         
-        if self.use_postgres:
-            cursor.execute(f"SELECT * FROM books WHERE LOWER(title) = LOWER({p})", (title,))
-        else:
-            cursor.execute(f"SELECT * FROM books WHERE title = {p} COLLATE NOCASE", (title,))
+        Pass the last ID of the previous page as after_id. Unlike OFFSET,
+        each page is an index seek plus `limit` rows.
+        """
+        p = self._placeholder()
         
-        row = cursor.fetchone()
-        conn.close()
-        return dict(row) if row else None
+        conditions = []
+        values: List[Any] = []
+        
+        if after_id is not None:
+            conditions.append(f"id > {p}")
+            values.append(after_id)
+        if genre:
+            conditions.append(f"genre = {p}")
+            values.append(genre)
+        if min_rating is not None:
+            conditions.append(f"rating >= {p}")
+            values.append(min_rating)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        values.append(limit)
+        
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT id, title, author, description, genre, rating, cover_url
+                FROM books
+                {where}
+                ORDER BY id
+                LIMIT {p}
+            """, values)
+            rows = cursor.fetchall()
+        return [dict(row) for row in rows]
+
+    def get_books_by_ids(self, book_ids: List[str]) -> Dict[str, Dict]:
+        """Batch lookup of persisted books by ID. Returns {book_id: book}."""
+        if not book_ids:
+            return {}
+        
+        p = self._placeholder()
+        placeholders = ", ".join([p] * len(book_ids))
+        
+        with self.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {', '.join(_BOOK_COLUMNS)} FROM books WHERE id IN ({placeholders})",
+                list(book_ids)
+            )
+            rows = cursor.fetchall()
+        return {row["id"]: dict(row) for row in rows}
 
     def search_books_sql(self, query: str, limit: int = 5) -> List[Dict]:
-        """Fallback SQL search using LIKE/ILIKE for title/author."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
+        """
+        Fallback SQL search over title/author.
+        
+        PostgreSQL: full-text match on the indexed tsv column, best
+        ts_rank first. SQLite: substring match via the trigram FTS index
+        (best bm25 rank first) for 3+ character queries, otherwise LIKE.
+        """
         p = self._placeholder()
-        search_term = f"%{query}%"
+        columns = ", ".join(_BOOK_COLUMNS)
         
-        if self.use_postgres:
-            cursor.execute(f"""
-                SELECT * FROM books 
-                WHERE title ILIKE {p} OR author ILIKE {p}
+        if not self.use_postgres and self._books_fts and len(query.strip()) >= 3:
+            # Quoted phrase: substring match, FTS operators in the query are inert
+            phrase = '"' + query.strip().replace('"', '""') + '"'
+            columns = ", ".join(f"b.{c}" for c in _BOOK_COLUMNS)
+            sql = f"""
+                SELECT {columns} FROM books_fts
+                JOIN books b ON b.rowid = books_fts.rowid
+                WHERE books_fts MATCH {p}
+                ORDER BY books_fts.rank
                 LIMIT {p}
-            """, (search_term, search_term, limit))
+            """
+            params = (phrase, limit)
+        elif self.use_postgres:
+            sql = f"""
+                SELECT {columns}
+                FROM books, plainto_tsquery('english', {p}) AS q
+                WHERE tsv @@ q
+                ORDER BY ts_rank(tsv, q) DESC
+                LIMIT {p}
+            """
+            params = (query, limit)
         else:
-            cursor.execute(f"""
-                SELECT * FROM books 
+            search_term = f"%{query}%"
+            sql = f"""
+                SELECT {columns} FROM books
                 WHERE title LIKE {p} OR author LIKE {p}
                 LIMIT {p}
-            """, (search_term, search_term, limit))
+            """
+            params = (search_term, search_term, limit)
         
-        rows = cursor.fetchall()
-        conn.close()
+        with self.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
         return [dict(row) for row in rows]
 
     # ============ INTERACTION METHODS ============
     
     def log_interaction(self, user_id: int, book_id: str, action: str, rating: float = None):
-        """Log a user interaction with a book."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
-        p = self._placeholder()
-        
-        final_action = action
-        if rating is not None:
-            final_action = f"{action}_{rating}"
-            
-        cursor.execute(
-            f"INSERT INTO interactions (user_id, book_id, action) VALUES ({p}, {p}, {p})",
-            (user_id, book_id, final_action)
-        )
-        conn.commit()
-        conn.close()
+        """Log a user interaction with a book (written behind, see add_chat_message)."""
+        self._enqueue_write("interactions", (user_id, str(book_id), action, rating))
     
     def get_user_interactions(self, user_id: int, action: str = None, limit: int = 50) -> List[Dict]:
         """Get user's book interactions."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
         p = self._placeholder()
         
-        if action:
-            cursor.execute(
-                f"SELECT book_id, action, timestamp FROM interactions WHERE user_id = {p} AND action = {p} ORDER BY timestamp DESC LIMIT {p}",
-                (user_id, action, limit)
-            )
-        else:
-            cursor.execute(
-                f"SELECT book_id, action, timestamp FROM interactions WHERE user_id = {p} ORDER BY timestamp DESC LIMIT {p}",
-                (user_id, limit)
-            )
-        
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        with self.cursor(dict_rows=False) as cursor:
+            if action:
+                cursor.execute(
+                    f"SELECT book_id, action, rating, timestamp FROM interactions WHERE user_id = {p} AND action = {p} ORDER BY timestamp DESC LIMIT {p}",
+                    (user_id, action, limit)
+                )
+            else:
+                cursor.execute(
+                    f"SELECT book_id, action, rating, timestamp FROM interactions WHERE user_id = {p} ORDER BY timestamp DESC LIMIT {p}",
+                    (user_id, limit)
+                )
+            rows = cursor.fetchall()
+        return [
+            {"book_id": book_id, "action": action, "rating": rating, "timestamp": timestamp}
+            for book_id, action, rating, timestamp in rows
+        ]
 
     def get_user_read_history(self, user_id: int, limit: int = 20) -> List[str]:
-        """Get a list of books the user has read or rated highly."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
+        """
+        Get the books the user has read or rated, most recent first.
+        
+        One entry per book (its latest read/rate action); the database
+        dedupes before LIMIT so up to `limit` distinct books come back.
+        """
+        with self._cache_lock:
+            cached = self._read_history_cache.get(user_id, {}).get(limit)
+        if cached is not None:
+            return list(cached)
+        
         p = self._placeholder()
+        with self.cursor(dict_rows=False) as cursor:
+            cursor.execute(f"""
+                SELECT b.title, r.rating
+                FROM (
+                    SELECT book_id, rating, timestamp,
+                           ROW_NUMBER() OVER (PARTITION BY book_id ORDER BY timestamp DESC, id DESC) AS rn
+                    FROM interactions
+                    WHERE user_id = {p} AND (action = 'read' OR rating IS NOT NULL)
+                ) r
+                JOIN books b ON r.book_id = b.id
+                WHERE r.rn = 1
+                ORDER BY r.timestamp DESC
+                LIMIT {p}
+            """, (user_id, limit))
+            rows = cursor.fetchall()
         
-        cursor.execute(f"""
-            SELECT b.title, i.action 
-            FROM interactions i
-            JOIN books b ON i.book_id = b.id
-            WHERE i.user_id = {p} AND (i.action LIKE 'rate_%' OR i.action = 'read')
-            ORDER BY i.timestamp DESC
-            LIMIT {p}
-        """, (user_id, limit))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        history = []
-        for row in rows:
-            title = row["title"]
-            action = row["action"]
-            if action.startswith("rate_"):
-                try:
-                    rating = action.split("_")[1]
-                    history.append(f"{title} (Rated {rating}/5)")
-                except:
-                    history.append(title)
-            else:
-                history.append(title)
-                
-        return list(set(history))
+        history = [
+            f"{title} (Rated {rating:g}/5)" if rating is not None else title
+            for title, rating in rows
+        ]
+        with self._cache_lock:
+            by_limit = self._read_history_cache.get(user_id)
+            if by_limit is None:
+                by_limit = self._read_history_cache[user_id] = {}
+            by_limit[limit] = history
+        return list(history)
 
     # ============ READING LIST METHODS ============
     
     def add_to_reading_list(self, user_id: int, book_id: str) -> bool:
-        """Add a book to user's reading list."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
+        """
+        Add a book to user's reading list in a single statement.
+        
+        The insert only fires for an existing user and is a no-op for
+        duplicates (UNIQUE(user_id, book_id)), so False means either
+        "unknown user" or "already in list".
+        """
         p = self._placeholder()
         
         try:
-            if self.use_postgres:
-                cursor.execute(
-                    f"INSERT INTO reading_list (user_id, book_id) VALUES ({p}, {p}) ON CONFLICT DO NOTHING",
-                    (user_id, book_id)
-                )
-            else:
-                cursor.execute(
-                    f"INSERT OR IGNORE INTO reading_list (user_id, book_id) VALUES ({p}, {p})",
-                    (user_id, book_id)
-                )
-            conn.commit()
-            success = cursor.rowcount > 0
-            conn.close()
-            return success
-        except Exception as e:
-            print(f"[DB] add_to_reading_list error: {e}")
-            conn.close()
+            with self.cursor() as cursor:
+                if self.use_postgres:
+                    cursor.execute(
+                        f"""INSERT INTO reading_list (user_id, book_id)
+                            SELECT {p}, {p} WHERE EXISTS (SELECT 1 FROM users WHERE id = {p})
+                            ON CONFLICT DO NOTHING""",
+                        (user_id, str(book_id), user_id)
+                    )
+                else:
+                    cursor.execute(
+                        f"""INSERT OR IGNORE INTO reading_list (user_id, book_id)
+                            SELECT {p}, {p} WHERE EXISTS (SELECT 1 FROM users WHERE id = {p})""",
+                        (user_id, str(book_id), user_id)
+                    )
+                success = cursor.rowcount > 0
+        except Exception:
+            logger.exception("add_to_reading_list failed")
             return False
+        
+        if success:
+            with self._cache_lock:
+                book_ids = self._reading_list_cache.get(user_id)
+                if book_ids is not None:
+                    book_ids.add(str(book_id))
+        return success
     
     def remove_from_reading_list(self, user_id: int, book_id: str) -> bool:
         """Remove a book from user's reading list."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
         p = self._placeholder()
-        
-        cursor.execute(
-            f"DELETE FROM reading_list WHERE user_id = {p} AND book_id = {p}",
-            (user_id, book_id)
-        )
-        conn.commit()
-        success = cursor.rowcount > 0
-        conn.close()
+        with self.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM reading_list WHERE user_id = {p} AND book_id = {p}",
+                (user_id, str(book_id))
+            )
+            success = cursor.rowcount > 0
+        with self._cache_lock:
+            book_ids = self._reading_list_cache.get(user_id)
+            if book_ids is not None:
+                book_ids.discard(str(book_id))
         return success
     
     def get_reading_list(self, user_id: int) -> List[Dict]:
-        """Get all books in user's reading list with full book details."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
-        p = self._placeholder()
+        """
+        Get every reading-list entry for a user, newest first, in one query.
         
-        cursor.execute(f"""
-            SELECT b.*, rl.added_at 
-            FROM reading_list rl
-            JOIN books b ON rl.book_id = b.id
-            WHERE rl.user_id = {p}
-            ORDER BY rl.added_at DESC
-        """, (user_id,))
-        rows = cursor.fetchall()
-        conn.close()
+        Each row has book_id plus the persisted book columns from a LEFT
+        JOIN on books; those are NULL (id is None) when the book is only
+        known to the vector store.
+        """
+        p = self._placeholder()
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT rl.book_id, rl.added_at,
+                       b.id, b.title, b.author, b.description, b.genre, b.rating, b.cover_url
+                FROM reading_list rl
+                LEFT JOIN books b ON b.id = rl.book_id
+                WHERE rl.user_id = {p}
+                ORDER BY rl.added_at DESC
+            """, (user_id,))
+            rows = cursor.fetchall()
+        with self._cache_lock:
+            self._reading_list_cache[user_id] = {row["book_id"] for row in rows}
         return [dict(row) for row in rows]
     
     def is_in_reading_list(self, user_id: int, book_id: str) -> bool:
-        """Check if a book is in user's reading list."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
-        p = self._placeholder()
+        """
+        Check if a book is in user's reading list.
         
-        cursor.execute(
-            f"SELECT 1 FROM reading_list WHERE user_id = {p} AND book_id = {p}",
-            (user_id, book_id)
-        )
-        exists = cursor.fetchone() is not None
-        conn.close()
-        return exists
+        Answered from the user's cached set of book IDs; on a miss the whole
+        set is loaded with one index scan, so checking every card on a
+        page costs at most one query. Not needed before add_to_reading_list,
+        whose INSERT already ignores duplicates.
+        """
+        with self._cache_lock:
+            book_ids = self._reading_list_cache.get(user_id)
+        if book_ids is None:
+            p = self._placeholder()
+            with self.cursor(dict_rows=False) as cursor:
+                cursor.execute(f"SELECT book_id FROM reading_list WHERE user_id = {p}", (user_id,))
+                book_ids = {row[0] for row in cursor.fetchall()}
+            with self._cache_lock:
+                self._reading_list_cache[user_id] = book_ids
+        return str(book_id) in book_ids
     
     # ============ SEARCH QUERY METHODS ============
     
     def log_search_query(self, user_id: int, query: str):
-        """Log a user's search query for personalization."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
-        p = self._placeholder()
-        
-        cursor.execute(
-            f"INSERT INTO search_queries (user_id, query) VALUES ({p}, {p})",
-            (user_id, query)
-        )
-        conn.commit()
-        conn.close()
+        """Log a user's search query for personalization (written behind, see add_chat_message)."""
+        self._enqueue_write("search_queries", (user_id, query))
     
     def get_recent_searches(self, user_id: int, limit: int = 10) -> List[str]:
         """Get user's recent search queries."""
-        conn = self._get_connection()
-        cursor = self._get_cursor(conn)
         p = self._placeholder()
-        
-        cursor.execute(f"""
-            SELECT DISTINCT query FROM search_queries 
-            WHERE user_id = {p} 
-            ORDER BY timestamp DESC 
-            LIMIT {p}
-        """, (user_id, limit))
-        rows = cursor.fetchall()
-        conn.close()
-        return [row["query"] for row in rows]
+        with self.cursor(dict_rows=False) as cursor:
+            cursor.execute(f"""
+                SELECT DISTINCT query FROM search_queries 
+                WHERE user_id = {p} 
+                ORDER BY timestamp DESC 
+                LIMIT {p}
+            """, (user_id, limit))
+            rows = cursor.fetchall()
+        return [row[0] for row in rows]
 
 
 # Singleton instance
 _db_instance: Optional[Database] = None
+_db_instance_lock = threading.Lock()
 
 def get_database() -> Database:
-    """Get or create database singleton."""
+    """Get or create database singleton (thread-safe first creation)."""
     global _db_instance
     if _db_instance is None:
-        _db_instance = Database()
+        with _db_instance_lock:
+            if _db_instance is None:
+                _db_instance = Database()
     return _db_instance
+
+
+async def warmup_database() -> Database:
+    """Create the singleton (connections + schema) in a worker thread; for app startup."""
+    return await asyncio.to_thread(get_database)
@@ -11,15 +11,21 @@ Architecture Decision:
 """
 
 import asyncio
+import bisect
 import os
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Tuple
 import numpy as np
 
 from app.config import get_settings
 from app.models.book import BookInDB
 
 
+def _trigrams(text: str) -> Set[str]:
+    """All 3-character substrings of text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
 class VectorStore:
     """
     FAISS-based vector store for book embeddings.
@@ -33,6 +39,12 @@ class VectorStore:
         self._settings = get_settings()
         self._index = None
         self._books: Dict[int, BookInDB] = {}  # index_id -> book
+        self._books_by_str_id: Dict[str, BookInDB] = {}  # str(book.id) -> book
+        self._by_rating: List[BookInDB] = []  # rating desc, ties in insertion order
+        self._genre_ranked: Dict[str, List[BookInDB]] = {}  # memo for top_rated(genre)
+        self._text_lower: Dict[int, Tuple[str, str]] = {}  # index_id -> (title, author) lowercased
+        self._trigrams: Dict[str, Set[int]] = {}  # trigram -> index_ids whose title/author contain it
+        self._version: int = 0  # bumped whenever the catalog changes
         self._next_id: int = 0
         self._lock = asyncio.Lock()
     
@@ -62,6 +74,14 @@ class VectorStore:
             books_data = np.load(str(books_path), allow_pickle=True).item()
             self._books = books_data.get("books", {})
             self._next_id = books_data.get("next_id", 0)
+            self._books_by_str_id = {str(b.id): b for b in self._books.values()}
+            self._by_rating = sorted(self._books.values(), key=lambda b: b.rating, reverse=True)
+            self._genre_ranked.clear()
+            self._text_lower.clear()
+            self._trigrams.clear()
+            for idx, book in self._books.items():
+                self._index_text(idx, book)
+            self._version += 1
             
             print(f"Loaded {self._index.ntotal} vectors")
         else:
@@ -96,10 +116,14 @@ class VectorStore:
             ids = list(range(self._next_id, self._next_id + len(books)))
             self._next_id += len(books)
             
-            # Add to book mapping
+            # Add to book mapping; one stable re-sort for the whole batch
+            # (per-book insort would be quadratic on a full catalog ingest)
             for idx, book in zip(ids, books):
-                self._books[idx] = book
-                book.embedding_id = idx
+                self._register_book(idx, book)
+            self._by_rating.extend(books)
+            self._by_rating.sort(key=lambda b: b.rating, reverse=True)
+            self._genre_ranked.clear()
+            self._version += 1
             
             # Add to FAISS index
             loop = asyncio.get_event_loop()
@@ -200,10 +224,95 @@ class VectorStore:
         """Return the number of vectors in the index."""
         return self._index.ntotal if self._index else 0
     
+    @property
+    def version(self) -> int:
+        """Catalog version; changes whenever books are added or reloaded."""
+        return self._version
+    
     def is_initialized(self) -> bool:
         """Check if the index is initialized."""
         return self._index is not None
     
+    def get_book(self, book_id: Any) -> Optional[BookInDB]:
+        """O(1) lookup of a book by its book ID (not the FAISS index ID)."""
+        return self._books_by_str_id.get(str(book_id))
+    
+    def top_rated(self, genre: Optional[str] = None, limit: int = 20) -> List[BookInDB]:
+        """
+        Highest-rated books, optionally only those whose genre contains
+        `genre` (case-insensitive).
+        
+        Served from the rating-sorted list; per-genre lists are memoized
+        until the catalog changes, so repeat calls are a slice.
+        """
+        if genre is None:
+            return self._by_rating[:limit]
+        
+        key = genre.lower()
+        ranked = self._genre_ranked.get(key)
+        if ranked is None:
+            ranked = [b for b in self._by_rating if key in b.genre.lower()]
+            self._genre_ranked[key] = ranked
+        return ranked[:limit]
+    
+    def search_text(self, query: str, limit: int = 20) -> List[BookInDB]:
+        """
+        Books whose title or author contains `query` (case-insensitive),
+        highest rated first.
+        
+        Queries of 3+ characters are narrowed through the trigram index
+        and only the candidates are substring-checked.
+        """
+        q = query.lower()
+        matches = [
+            self._books[idx] for idx in self._text_candidates(q)
+            if q in self._text_lower[idx][0] or q in self._text_lower[idx][1]
+        ]
+        matches.sort(key=lambda b: b.rating, reverse=True)
+        return matches[:limit]
+    
+    def find_by_title_substring(self, title: str, top: int = 3) -> List[BookInDB]:
+        """First `top` books (in index order) whose title contains `title`, case-insensitive."""
+        q = title.lower()
+        matches = []
+        for idx in self._text_candidates(q):
+            if q in self._text_lower[idx][0]:
+                matches.append(self._books[idx])
+                if len(matches) == top:
+                    break
+        return matches
+    
+    def _text_candidates(self, q: str) -> List[int]:
+        """Index IDs that may contain lowercased `q`, in index order (superset)."""
+        grams = _trigrams(q)
+        if not grams:
+            return list(self._text_lower)
+        postings = sorted((self._trigrams.get(g, set()) for g in grams), key=len)
+        if not postings[0]:
+            return []
+        return sorted(set.intersection(*postings))
+    
+    def _register_book(self, idx: int, book: BookInDB) -> None:
+        """Register a book under its FAISS ID in the ID and text lookups."""
+        self._books[idx] = book
+        self._books_by_str_id[str(book.id)] = book
+        book.embedding_id = idx
+        self._index_text(idx, book)
+    
+    def _index_book(self, idx: int, book: BookInDB) -> None:
+        """Register a single book in every lookup structure, rating order included."""
+        self._register_book(idx, book)
+        bisect.insort(self._by_rating, book, key=lambda b: -b.rating)
+        self._genre_ranked.clear()
+        self._version += 1
+    
+    def _index_text(self, idx: int, book: BookInDB) -> None:
+        """Add a book's lowercased title/author to the text search index."""
+        title, author = book.title.lower(), book.author.lower()
+        self._text_lower[idx] = (title, author)
+        for gram in _trigrams(title) | _trigrams(author):
+            self._trigrams.setdefault(gram, set()).add(idx)
+    
     @property
     def metadata(self) -> List[BookInDB]:
         """Return all books as a list for JIT enrichment lookups."""
@@ -235,8 +344,7 @@ class VectorStore:
             self._next_id += 1
             
             # Store book
-            self._books[idx] = book
-            book.embedding_id = idx
+            self._index_book(idx, book)
             
             # Add to FAISS
             loop = asyncio.get_event_loop()
@@ -7,16 +7,47 @@ This module initializes the FastAPI application with:
 - API router mounting with versioning
 """
 
+import asyncio
+import logging
+import queue
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from logging.handlers import QueueHandler, QueueListener
+from typing import AsyncGenerator, Tuple
 
+import aiohttp
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.api.v1.router import api_router
 from app.config import get_settings
+from app.db.database import get_database, warmup_database
 from app.db.vector_store import VectorStore
 from app.services.embedding import EmbeddingService
+from app.services.session_store import get_session_store
+
+
+def _start_queue_logging(debug: bool) -> Tuple[QueueHandler, QueueListener]:
+    """
+    Route the app's log records through a queue.
+    
+    Request handlers only enqueue records; formatting and the blocking
+    stream write happen on the listener's background thread.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(
+        logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    )
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    
+    queue_handler = QueueHandler(log_queue)
+    app_logger = logging.getLogger("app")
+    app_logger.addHandler(queue_handler)
+    app_logger.setLevel(logging.DEBUG if debug else logging.INFO)
+    
+    listener.start()
+    return queue_handler, listener
 
 
 @asynccontextmanager
@@ -27,23 +58,37 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     Startup:
     - Initialize embedding model (lazy loading for faster cold starts)
     - Load or create FAISS index
+    - Open a shared HTTP session for outbound API calls (connection reuse)
+    - Start queue-based logging (no stream I/O on the request path)
     
     Shutdown:
     - Persist FAISS index to disk
-    - Clean up resources
+    - Clean up resources (HTTP session, log listener)
     """
     settings = get_settings()
     
     # --- STARTUP ---
     print(f"Starting {settings.app_name}...")
     
+    # Non-blocking logging for the app.* loggers
+    log_handler, log_listener = _start_queue_logging(settings.debug)
+    
     # Initialize services and store in app.state for access in routes
     # Using lazy initialization - models load on first use
     app.state.embedding_service = EmbeddingService()
     app.state.vector_store = VectorStore()
     
-    # Attempt to load existing FAISS index
-    await app.state.vector_store.initialize()
+    # Shared HTTP session: keep-alive connections to Google Books etc.
+    app.state.http_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+    )
+    
+    # Set up the shared Database (schema) now rather than on the first
+    # request, off the loop and alongside loading the FAISS index
+    await asyncio.gather(
+        warmup_database(),
+        app.state.vector_store.initialize()
+    )
     
     print("Application started successfully")
     
@@ -55,6 +100,19 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Persist vector store to disk
     await app.state.vector_store.persist()
     
+    # Close shared HTTP session
+    await app.state.http_session.close()
+    
+    # Release the anonymous session store (Redis pool if configured)
+    await get_session_store().close()
+    
+    # Close pooled database connections
+    get_database().close()
+    
+    # Flush queued log records and detach the handler
+    log_listener.stop()
+    logging.getLogger("app").removeHandler(log_handler)
+    
     print("Shutdown complete")
 
 
@@ -78,6 +136,7 @@ def create_application() -> FastAPI:
         ),
         version="0.1.0",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,  # orjson: faster JSON encoding
         docs_url="/docs",
         redoc_url="/redoc",
         openapi_url="/openapi.json"
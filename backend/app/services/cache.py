@@ -4,16 +4,20 @@ Cache Service
 Provides in-memory caching for expensive operations:
 - Query embeddings (repeated queries)
 - Retrieval results (same query + filters)
+- Google Books cover lookups (hits and misses)
+- Final chat recommendations (query embedding + request context)
+- Intent analyses (exact analyze_query prompt)
 
 Using cachetools for TTL-based expiration and size limits.
 """
 
-from typing import Any, Optional, Callable, TypeVar
+from typing import Any, Optional, Callable, Tuple, TypeVar
 from functools import wraps
 import hashlib
 import json
 
-from cachetools import TTLCache
+import numpy as np
+from cachetools import LRUCache, TTLCache
 
 from app.config import get_settings
 
@@ -28,15 +32,20 @@ class CacheService:
     Provides separate caches for different use cases:
     - embedding_cache: Query string -> embedding vector
     - retrieval_cache: (query_hash, filters_hash) -> candidates
+    - cover_cache: (title, author) -> cover URL, with a shorter-lived
+      negative cache so misses don't re-hit the rate-limited API
+    - recommendation_cache: (embedding_hash, context) -> reranked results
+    - analysis_cache: prompt_hash -> parsed analyze_query output
     """
     
     def __init__(self):
         settings = get_settings()
         
-        # Cache for query embeddings
-        self._embedding_cache: TTLCache = TTLCache(
-            maxsize=settings.cache_max_size,
-            ttl=settings.cache_ttl_seconds
+        # Cache for query embeddings. A query's embedding never goes stale,
+        # so this is size-bounded only: no TTL expiry means no burst of
+        # simultaneous misses when a hot entry's TTL runs out.
+        self._embedding_cache: LRUCache = LRUCache(
+            maxsize=settings.cache_max_size
         )
         
         # Cache for retrieval results
@@ -45,25 +54,57 @@ class CacheService:
             ttl=settings.cache_ttl_seconds
         )
         
+        # Cache for Google Books cover lookups (hits and misses)
+        self._cover_cache: TTLCache = TTLCache(
+            maxsize=settings.cache_max_size * 10,
+            ttl=settings.cover_cache_ttl_seconds
+        )
+        self._cover_miss_cache: TTLCache = TTLCache(
+            maxsize=settings.cache_max_size * 10,
+            ttl=settings.cover_miss_ttl_seconds
+        )
+        
+        # Cache for final chat recommendations (post-rerank)
+        self._recommendation_cache: TTLCache = TTLCache(
+            maxsize=settings.cache_max_size * 10,
+            ttl=settings.recommendation_cache_ttl_seconds
+        )
+        
+        # Cache for intent analyses. Keyed on the full prompt, which already
+        # carries message, recent history, persona, name and profile.
+        self._analysis_cache: TTLCache = TTLCache(
+            maxsize=settings.cache_max_size * 4,
+            ttl=settings.cache_ttl_seconds
+        )
+        
         # Cache statistics
         self._stats = {
             "embedding_hits": 0,
             "embedding_misses": 0,
             "retrieval_hits": 0,
-            "retrieval_misses": 0
+            "retrieval_misses": 0,
+            "cover_hits": 0,
+            "cover_misses": 0,
+            "recommendation_hits": 0,
+            "recommendation_misses": 0,
+            "analysis_hits": 0,
+            "analysis_misses": 0
         }
     
     def get_embedding(self, query: str) -> Optional[Any]:
         """
         Get cached embedding for a query.
         
+        Queries are normalized (lowercased, whitespace collapsed) so trivial
+        variants share an entry; the default MiniLM model is uncased anyway.
+        
         Args:
             query: The query string
             
         Returns:
             Cached embedding or None if not found
         """
-        key = self._hash_string(query)
+        key = self._hash_string(self._normalize_query(query))
         result = self._embedding_cache.get(key)
         
         if result is not None:
@@ -77,11 +118,16 @@ class CacheService:
         """
         Cache an embedding for a query.
         
+        Stored as a compact read-only float32 array: callers share the
+        cached buffer, so it must never be modified in place.
+        
         Args:
             query: The query string
             embedding: The embedding to cache
         """
-        key = self._hash_string(query)
+        key = self._hash_string(self._normalize_query(query))
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
         self._embedding_cache[key] = embedding
     
     def get_retrieval(self, query: str, filters: Optional[dict]) -> Optional[Any]:
@@ -122,6 +168,108 @@ class CacheService:
         key = self._get_retrieval_key(query, filters)
         self._retrieval_cache[key] = candidates
     
+    def get_cover(self, title: str, author: str) -> Tuple[bool, Optional[str]]:
+        """
+        Get a cached cover lookup.
+        
+        Args:
+            title: Book title
+            author: Author name
+            
+        Returns:
+            (found, cover_url). found=True with cover_url=None means a
+            recent lookup found no cover (negative cache hit).
+        """
+        key = self._get_cover_key(title, author)
+        
+        if key in self._cover_cache:
+            self._stats["cover_hits"] += 1
+            return True, self._cover_cache[key]
+        if key in self._cover_miss_cache:
+            self._stats["cover_hits"] += 1
+            return True, None
+        
+        self._stats["cover_misses"] += 1
+        return False, None
+    
+    def set_cover(self, title: str, author: str, cover_url: Optional[str]) -> None:
+        """
+        Cache a cover lookup result.
+        
+        Args:
+            title: Book title
+            author: Author name
+            cover_url: The cover URL, or None to record a miss
+        """
+        key = self._get_cover_key(title, author)
+        if cover_url:
+            self._cover_cache[key] = cover_url
+            self._cover_miss_cache.pop(key, None)
+        else:
+            self._cover_miss_cache[key] = True
+    
+    def get_recommendations(self, embedding: np.ndarray, context: dict) -> Optional[Any]:
+        """
+        Get cached recommendations for a query embedding.
+        
+        Args:
+            embedding: The query embedding
+            context: Everything else the results depend on (filters,
+                count, personality, mood, catalog size, ...)
+            
+        Returns:
+            Cached recommendations or None if not found
+        """
+        key = self._get_recommendation_key(embedding, context)
+        result = self._recommendation_cache.get(key)
+        
+        if result is not None:
+            self._stats["recommendation_hits"] += 1
+        else:
+            self._stats["recommendation_misses"] += 1
+        
+        return result
+    
+    def set_recommendations(
+        self,
+        embedding: np.ndarray,
+        context: dict,
+        recommendations: Any
+    ) -> None:
+        """
+        Cache final recommendations for a query embedding.
+        
+        Args:
+            embedding: The query embedding
+            context: Same context dict passed to get_recommendations
+            recommendations: The recommendations to cache
+        """
+        key = self._get_recommendation_key(embedding, context)
+        self._recommendation_cache[key] = recommendations
+    
+    def get_analysis(self, prompt: str) -> Optional[dict]:
+        """
+        Get a cached intent analysis for an analyze_query prompt.
+        
+        Returns:
+            A copy of the cached analysis or None if not found
+        """
+        result = self._analysis_cache.get(self._get_analysis_key(prompt))
+        
+        if result is not None:
+            self._stats["analysis_hits"] += 1
+            return dict(result)
+        self._stats["analysis_misses"] += 1
+        return None
+    
+    def set_analysis(self, prompt: str, analysis: dict) -> None:
+        """Cache a parsed intent analysis for an analyze_query prompt."""
+        self._analysis_cache[self._get_analysis_key(prompt)] = analysis
+    
+    def _normalize_query(self, query: str) -> str:
+        """Lowercase and collapse whitespace in a query string."""
+        return " ".join(query.lower().split())
+    
     def _hash_string(self, s: str) -> str:
         """Create a hash key from a string."""
         return hashlib.md5(s.encode()).hexdigest()
@@ -132,6 +280,20 @@ class CacheService:
         combined = f"{query}:{filters_str}"
         return self._hash_string(combined)
     
+    def _get_cover_key(self, title: str, author: str) -> str:
+        """Create a normalized key from title and author."""
+        return self._hash_string(f"{title.lower().strip()}:{author.lower().strip()}")
+    
+    def _get_recommendation_key(self, embedding: np.ndarray, context: dict) -> str:
+        """Create a key from the raw embedding bytes and a context dict."""
+        h = hashlib.blake2b(np.asarray(embedding, dtype=np.float32).tobytes(), digest_size=16)
+        h.update(json.dumps(context, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+    
+    def _get_analysis_key(self, prompt: str) -> str:
+        """Create a compact key from a full LLM prompt."""
+        return hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+    
     def get_stats(self) -> dict:
         """
         Get cache statistics.
@@ -142,13 +304,20 @@ class CacheService:
         return {
             **self._stats,
             "embedding_cache_size": len(self._embedding_cache),
-            "retrieval_cache_size": len(self._retrieval_cache)
+            "retrieval_cache_size": len(self._retrieval_cache),
+            "cover_cache_size": len(self._cover_cache) + len(self._cover_miss_cache),
+            "recommendation_cache_size": len(self._recommendation_cache),
+            "analysis_cache_size": len(self._analysis_cache)
         }
     
     def clear(self) -> None:
         """Clear all caches."""
         self._embedding_cache.clear()
         self._retrieval_cache.clear()
+        self._cover_cache.clear()
+        self._cover_miss_cache.clear()
+        self._recommendation_cache.clear()
+        self._analysis_cache.clear()
         self._stats = {k: 0 for k in self._stats}
 
 
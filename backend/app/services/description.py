@@ -3,18 +3,26 @@ JIT Description Service
 
 Generates book descriptions on-demand using Gemini, with:
 - 10-second timeout to prevent freezing
-- Persistence to JSON for caching
-- Graceful fallback on failure
+- Persistence to JSON for caching (loaded once, written in the background)
+- Concurrent requests for one book sharing a single fetch
+- Graceful fallback on failure (remembered for a while, not retried per turn)
 """
 
 import asyncio
 import json
+import logging
 import os
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, Set
 from functools import lru_cache
 
+from cachetools import TTLCache
+
 from app.config import get_settings
+from app.services.llm_limiter import generate_content
+
+
+logger = logging.getLogger(__name__)
 
 
 class DescriptionService:
@@ -22,15 +30,12 @@ class DescriptionService:
     Service for Just-In-Time description generation and persistence.
     
     Workflow:
-    1. Check if book already has description in memory/JSON
+    1. Check if book already has description in memory (JSON loaded once)
     2. If not, generate using Gemini with 10s timeout
-    3. Persist to JSON immediately after generation
+    3. Persist to JSON in the background after generation
     4. Return description (or fallback message)
     """
     
-    # In-memory cache of generated descriptions (book_id -> description)
-    _description_cache: Dict[str, str] = {}
-    
     def __init__(self):
         self._settings = get_settings()
         self._client = None
@@ -38,6 +43,19 @@ class DescriptionService:
         self._descriptions_path = Path("data/descriptions_cache.json")
         self._timeout_seconds = 10
         
+        # All known descriptions (book_id -> description); the JSON file is
+        # read into this once, on first use
+        self._descriptions: Optional[Dict[str, str]] = None
+        # Books that got the fallback text; not retried until this expires
+        self._misses: TTLCache = TTLCache(
+            maxsize=10_000, ttl=self._settings.description_miss_ttl_seconds
+        )
+        # In-flight lookups (book_id -> task), shared by concurrent callers
+        self._inflight: Dict[str, "asyncio.Task[str]"] = {}
+        # JSON writes run one at a time, off the event loop
+        self._persist_lock = asyncio.Lock()
+        self._persist_tasks: Set["asyncio.Task[None]"] = set()
+        
     async def _initialize_client(self) -> bool:
         """Lazily initialize Gemini client."""
         if self._client is not None:
@@ -53,7 +71,7 @@ class DescriptionService:
             self._client = genai.GenerativeModel(model_name)
             return True
         except Exception as e:
-            print(f"[DescriptionService] Failed to init Gemini: {e}")
+            logger.warning("Failed to init Gemini for descriptions: %s", e)
             return False
     
     async def get_or_generate(
@@ -75,23 +93,40 @@ class DescriptionService:
         Returns:
             Book description (or fallback message)
         """
-        # 1. Check in-memory cache first
-        if book_id in self._description_cache:
-            return self._description_cache[book_id]
+        # 1. Known descriptions (memory, backed by the persisted JSON)
+        descriptions = await self._get_descriptions()
+        known = descriptions.get(book_id) or self._misses.get(book_id)
+        if known:
+            return known
         
-        # 2. Check persisted descriptions
-        persisted = await self._load_persisted_description(book_id)
-        if persisted:
-            self._description_cache[book_id] = persisted
-            return persisted
+        # 2. Generate (shared with concurrent calls for this book)
+        task = self._inflight.get(book_id)
+        if task is None:
+            task = asyncio.create_task(self._generate_and_store(book_id, title, author, genre))
+            self._inflight[book_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(book_id, None))
         
-        # 3. Generate new description with timeout
+        # shield: a cancelled caller must not cancel the lookup for the others
+        return await asyncio.shield(task)
+    
+    async def _generate_and_store(
+        self,
+        book_id: str,
+        title: str,
+        author: str,
+        genre: str
+    ) -> str:
+        """Generate a description, then cache it (and persist it if real)."""
         description = await self._generate_with_timeout(title, author, genre)
         
-        # 4. Persist and cache
         if description and not description.startswith("Description"):
-            self._description_cache[book_id] = description
-            await self._persist_description(book_id, description)
+            self._descriptions[book_id] = description
+            # Persist without holding up the response
+            task = asyncio.create_task(self._persist_descriptions())
+            self._persist_tasks.add(task)
+            task.add_done_callback(self._persist_tasks.discard)
+        else:
+            self._misses[book_id] = description
         
         return description
     
@@ -137,17 +172,17 @@ Constraints:
 
         try:
             response = await asyncio.wait_for(
-                self._client.generate_content_async(prompt),
+                generate_content(self._client, prompt),
                 timeout=self._timeout_seconds
             )
             text = response.text.strip()
             # Mark it so we know it came from AI
             return f"{text} (Source: AI Generated)"
         except asyncio.TimeoutError:
-            print(f"[DescriptionService] Gemini timeout for '{title}'")
+            logger.warning("Gemini description timeout for '%s'", title)
             return None
         except Exception as e:
-            print(f"[DescriptionService] Gemini error: {e}")
+            logger.warning("Gemini description error: %s", e)
             return None
     
     async def _try_google_books(self, title: str, author: str) -> str:
@@ -208,31 +243,38 @@ Constraints:
         
         return None
     
-    async def _load_persisted_description(self, book_id: str) -> Optional[str]:
-        """Load description from persisted JSON cache."""
+    async def _get_descriptions(self) -> Dict[str, str]:
+        """All known descriptions; reads the persisted JSON on first use."""
+        if self._descriptions is None:
+            loaded = await asyncio.to_thread(self._read_descriptions_file)
+            # Another caller may have loaded it while this one waited
+            if self._descriptions is None:
+                self._descriptions = loaded
+        return self._descriptions
+    
+    def _read_descriptions_file(self) -> Dict[str, str]:
+        """Load the persisted JSON cache (empty if missing or unreadable)."""
         try:
             if self._descriptions_path.exists():
                 with open(self._descriptions_path, 'r', encoding='utf-8') as f:
-                    cache = json.load(f)
-                    return cache.get(book_id)
+                    return json.load(f)
         except Exception:
             pass
-        return None
+        return {}
     
-    async def _persist_description(self, book_id: str, description: str):
-        """Save description to persistent JSON cache."""
-        try:
-            cache = {}
-            if self._descriptions_path.exists():
-                with open(self._descriptions_path, 'r', encoding='utf-8') as f:
-                    cache = json.load(f)
-            
-            cache[book_id] = description
-            
-            with open(self._descriptions_path, 'w', encoding='utf-8') as f:
-                json.dump(cache, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"[DescriptionService] Failed to persist description: {e}")
+    async def _persist_descriptions(self):
+        """Save all known descriptions to the persistent JSON cache."""
+        async with self._persist_lock:
+            snapshot = dict(self._descriptions)
+            try:
+                await asyncio.to_thread(self._write_descriptions_file, snapshot)
+            except Exception as e:
+                logger.warning("Failed to persist description: %s", e)
+    
+    def _write_descriptions_file(self, descriptions: Dict[str, str]):
+        """Write the JSON cache (runs in a worker thread)."""
+        with open(self._descriptions_path, 'w', encoding='utf-8') as f:
+            json.dump(descriptions, f, indent=2, ensure_ascii=False)
 
 
 # Singleton instance
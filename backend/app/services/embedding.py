@@ -30,6 +30,8 @@ class EmbeddingService:
         self._model = None
         self._settings = get_settings()
         self._lock = asyncio.Lock()
+        # Bound concurrent encodes: extra ones only contend for the same cores
+        self._slots = asyncio.Semaphore(self._settings.embedding_max_concurrency)
     
     async def _load_model(self) -> None:
         """
@@ -74,10 +76,11 @@ class EmbeddingService:
         
         # Run encoding in thread pool (CPU-bound)
         loop = asyncio.get_event_loop()
-        embedding = await loop.run_in_executor(
-            None,
-            lambda: self._model.encode(text, convert_to_numpy=True)
-        )
+        async with self._slots:
+            embedding = await loop.run_in_executor(
+                None,
+                lambda: self._model.encode(text, convert_to_numpy=True)
+            )
         
         return embedding
     
@@ -97,14 +100,15 @@ class EmbeddingService:
         await self._load_model()
         
         loop = asyncio.get_event_loop()
-        embeddings = await loop.run_in_executor(
-            None,
-            lambda: self._model.encode(
-                texts,
-                convert_to_numpy=True,
-                show_progress_bar=len(texts) > 100
+        async with self._slots:
+            embeddings = await loop.run_in_executor(
+                None,
+                lambda: self._model.encode(
+                    texts,
+                    convert_to_numpy=True,
+                    show_progress_bar=len(texts) > 100
+                )
             )
-        )
         
         return embeddings
     
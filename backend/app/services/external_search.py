@@ -15,6 +15,7 @@ import aiohttp
 from typing import Optional, List, Dict, Any
 
 from app.config import get_settings
+from app.services.llm_limiter import generate_content
 from app.models.book import BookInDB
 
 
@@ -207,7 +208,7 @@ RULES:
 - Neutral descriptions"""
 
         try:
-            response = await self._client.generate_content_async(prompt)
+            response = await generate_content(self._client, prompt)
             text = response.text.strip()
             
             # Clean JSON
@@ -0,0 +1,35 @@
+"""
+LLM Admission Control
+
+Every Gemini call (intent analysis, narration, descriptions, JIT book
+generation) draws on the same API quota. A single process-wide semaphore
+bounds how many are in flight, so request bursts queue in-process instead
+of fanning out into 429s and retry storms.
+"""
+
+import asyncio
+from typing import Any, Optional
+
+from app.config import get_settings
+
+
+_gemini_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_gemini_semaphore() -> asyncio.Semaphore:
+    """Get the shared semaphore bounding concurrent Gemini calls."""
+    global _gemini_semaphore
+    if _gemini_semaphore is None:
+        _gemini_semaphore = asyncio.Semaphore(get_settings().gemini_max_concurrency)
+    return _gemini_semaphore
+
+
+async def generate_content(client: Any, prompt: str, **kwargs) -> Any:
+    """
+    Call client.generate_content_async under the shared concurrency limit.
+
+    For stream=True, hold get_gemini_semaphore() around the iteration
+    instead; this only covers the initial call.
+    """
+    async with get_gemini_semaphore():
+        return await client.generate_content_async(prompt, **kwargs)
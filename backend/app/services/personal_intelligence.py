@@ -3,6 +3,7 @@ Personal Intelligence Service
 
 Loads the trained PyTorch model (personal_intelligence_v2.pth) and provides:
 - predict_scores(book_ids, mood): Deterministic ranking scores
+- score_array(book_ids, mood): Same scores as an array, in input order
 - predict_strategy(mood): Strategy selection (comfort, challenge, etc.)
 
 This is the AUTHORITATIVE decision-maker. The LLM does NOT override this.
@@ -10,6 +11,7 @@ This is the AUTHORITATIVE decision-maker. The LLM does NOT override this.
 
 import os
 import json
+import numpy as np
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
@@ -170,30 +172,34 @@ class PersonalIntelligenceService:
         Predict relevance scores for a list of books given the current mood.
         Returns list of (book_id, score) tuples sorted by score descending.
         """
+        scores = self.score_array(book_ids, mood)
+        order = np.argsort(-scores, kind="stable")
+        return [(book_ids[i], float(scores[i])) for i in order]
+    
+    def score_array(self, book_ids: List[str], mood: str = "neutral") -> np.ndarray:
+        """
+        Relevance scores for `book_ids` (float32, same order as the input),
+        from one batched forward pass.
+        """
         if self.model is None:
-            # Fallback: return books in original order with dummy scores
-            return [(bid, 3.0 + i * 0.1) for i, bid in enumerate(book_ids)]
+            # Fallback: dummy scores that keep the original order
+            return 3.0 - 0.1 * np.arange(len(book_ids), dtype=np.float32)
         
         mood_idx = self.MOOD_MAP.get(mood.lower(), 0)
+        num_books = self.model.book_emb.num_embeddings
         
-        results = []
-        for book_id in book_ids:
-            # Map book_id to index (fallback to hash if not in map)
-            if book_id in self.book_to_idx:
-                b_idx = self.book_to_idx[book_id]
-            else:
-                b_idx = hash(book_id) % self.model.book_emb.num_embeddings
-            
-            with torch.no_grad():
-                b_tensor = torch.tensor([b_idx], dtype=torch.long)
-                m_tensor = torch.tensor([mood_idx], dtype=torch.long)
-                
-                score, _ = self.model(b_tensor, m_tensor)
-                results.append((book_id, float(score.squeeze().item())))
+        # Map book_id to index (fallback to hash if not in map)
+        b_idx = [
+            self.book_to_idx[book_id] if book_id in self.book_to_idx else hash(book_id) % num_books
+            for book_id in book_ids
+        ]
+        
+        with torch.no_grad():
+            b_tensor = torch.tensor(b_idx, dtype=torch.long)
+            m_tensor = torch.full((len(b_idx),), mood_idx, dtype=torch.long)
+            scores, _ = self.model(b_tensor, m_tensor)
         
-        # Sort by score descending
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results
+        return scores.reshape(-1).numpy().astype(np.float32, copy=False)
     
     def predict_strategy(self, mood: str = "neutral") -> str:
         """
@@ -13,13 +13,32 @@ Cost Controls:
 - JSON output is mandatory for structured calls.
 """
 
+import asyncio
 import json
-from typing import List, Dict, Any, Optional
+import logging
+from typing import AsyncIterator, List, Dict, Any, Optional
 
 from app.config import get_settings
+from app.services.llm_limiter import generate_content, get_gemini_semaphore
+from app.services.cache import get_cache_service
 from app.models.recommendation import RecommendationCandidate, RecommendationResult
 
 
+logger = logging.getLogger(__name__)
+
+
+# Chat messages of history included in the analyze_query prompt
+HISTORY_CONTEXT_MESSAGES = 4
+# Older messages are folded into a rolling summary once this many are new
+SUMMARY_REFRESH_MESSAGES = 10
+
+# Bare greetings answered with the persona's greeting, no LLM call
+_GREETINGS = frozenset({
+    "hi", "hey", "hello", "hiya", "yo", "good morning", "good afternoon",
+    "good evening", "what's up", "whats up", "sup"
+})
+
+
 # ============================================================
 # LAYER 1: CONVERSATIONAL LAYER (Persona Definitions)
 # ============================================================
@@ -75,6 +94,47 @@ You're secretly caring beneath the snark.
 }
 
 
+class _JsonObjectScanner:
+    """
+    Incrementally pulls complete top-level {...} objects out of a streamed
+    JSON array (tolerates markdown fences around it).
+    """
+    
+    def __init__(self):
+        self._buf: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text; return any objects it completed."""
+        objects = []
+        for ch in chunk:
+            if self._depth:
+                self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if not self._depth:
+                    self._buf = [ch]
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if not self._depth:
+                    try:
+                        objects.append(json.loads("".join(self._buf)))
+                    except ValueError:
+                        pass
+        return objects
+
+
 class RerankingService:
     """
     Service for LLM-based intent analysis, reranking, and explanation generation.
@@ -91,7 +151,7 @@ class RerankingService:
             return True
         
         if not self._settings.gemini_api_key or self._settings.gemini_api_key == "your_gemini_api_key_here":
-            print("[RerankingService] Gemini API key not configured.")
+            logger.warning("Gemini API key not configured.")
             return False
         
         try:
@@ -99,10 +159,10 @@ class RerankingService:
             genai.configure(api_key=self._settings.gemini_api_key)
             model_name = getattr(self._settings, 'gemini_model', 'gemini-2.0-flash')
             self._client = genai.GenerativeModel(model_name)
-            print(f"[RerankingService] Gemini client initialized: {model_name}")
+            logger.info("Gemini client initialized: %s", model_name)
             return True
         except Exception as e:
-            print(f"[RerankingService] Failed to initialize Gemini: {e}")
+            logger.error("Failed to initialize Gemini: %s", e)
             return False
 
     # ============================================================
@@ -114,7 +174,8 @@ class RerankingService:
         chat_history: List[Dict[str, str]] = None,
         personality: str = "friendly",
         user_name: str = "friend",
-        user_profile_summary: str = ""
+        user_profile_summary: str = "",
+        conversation_summary: str = ""
     ) -> Dict[str, Any]:
         """
         Extract user intent, mood, and constraints using a lightweight LLM call.
@@ -132,25 +193,35 @@ class RerankingService:
             "inferred_genres": []
         }
         
+        persona = PERSONAS.get(personality, PERSONAS["friendly"])
+        
+        if user_message.lower().strip(" !.?") in _GREETINGS:
+            return {
+                **fallback,
+                "needs_book_search": False,
+                "direct_response": persona["sample_greeting"]
+            }
+        
         if not await self._initialize_client():
             return fallback
 
-        # Build minimal history context (last 4 messages for cost)
+        # Build minimal history context (last few messages for cost)
         history_text = ""
         if chat_history:
             history_text = "\n".join([
                 f"{msg.get('role', 'user').upper()}: {msg.get('content', msg.get('message', ''))[:100]}" 
-                for msg in chat_history[-4:]
+                for msg in chat_history[-HISTORY_CONTEXT_MESSAGES:]
             ])
         
-        persona = PERSONAS.get(personality, PERSONAS["friendly"])
+        # Older turns arrive pre-summarized (see summarize_history)
+        summary_text = f"EARLIER CONVERSATION (summary): {conversation_summary}" if conversation_summary else ""
         
         # HARDENED PROMPT: Short, structured, JSON-only output
         prompt = f"""ROLE: {persona['name']} ({personality} librarian assistant).
 USER NAME: {user_name}
 
 {user_profile_summary}
-
+{summary_text}
 RECENT HISTORY:
 {history_text if history_text else "(Start of conversation)"}
 
@@ -177,8 +248,14 @@ RULES:
 OUTPUT (strict JSON, no markdown):
 {{"needs_book_search":boolean,"optimized_query":"keywords","emotional_context":"mood","direct_response":"string or null","requested_count":number,"specific_book_requested":"title or null","inferred_genres":["genre1"]}}"""
 
+        # Same prompt (message, history, persona, profile) -> same analysis
+        cache = get_cache_service()
+        cached = cache.get_analysis(prompt)
+        if cached is not None:
+            return cached
+        
         try:
-            response = await self._client.generate_content_async(prompt)
+            response = await generate_content(self._client, prompt)
             text = response.text.strip()
             
             # Clean JSON extraction
@@ -191,7 +268,7 @@ OUTPUT (strict JSON, no markdown):
             text = text.strip()
             if not text.startswith("{"):
                 # Model didn't follow instructions, use fallback
-                print(f"[analyze_query] Non-JSON response: {text[:100]}")
+                logger.warning("analyze_query: non-JSON response: %s", text[:100])
                 return fallback
                 
             data = json.loads(text)
@@ -202,7 +279,7 @@ OUTPUT (strict JSON, no markdown):
                 count = 5
             count = min(count, 20)  # Cap at 20
             
-            return {
+            analysis = {
                 "needs_book_search": data.get("needs_book_search", True),
                 "optimized_query": data.get("optimized_query", user_message),
                 "emotional_context": data.get("emotional_context", "neutral"),
@@ -211,8 +288,10 @@ OUTPUT (strict JSON, no markdown):
                 "specific_book_requested": data.get("specific_book_requested"),
                 "inferred_genres": data.get("inferred_genres", [])
             }
+            cache.set_analysis(prompt, analysis)
+            return dict(analysis)
         except Exception as e:
-            print(f"[analyze_query] Error: {e}")
+            logger.warning("analyze_query error: %s", e)
             return fallback
 
     # ============================================================
@@ -272,7 +351,106 @@ OUTPUT (strict JSON, no markdown):
         
         # Limit candidates for prompt size
         candidates = candidates[:min(len(candidates), 15)]
+        prompt = self._build_rerank_prompt(candidates, user_context, top_k)
+        
+        try:
+            response = await generate_content(self._client, prompt)
+            text = response.text.strip()
+            
+            # Clean JSON
+            if "```json" in text:
+                text = text.split("```json")[1].split("```")[0]
+            elif "```" in text:
+                text = text.split("```")[1].split("```")[0]
+            
+            parsed = json.loads(text.strip())
+            
+            results = []
+            seen_ids = set()
+            for item in parsed:
+                result = self._result_from_item(item, candidates, len(results) + 1)
+                # The LLM may repeat a book_index; keep the first
+                if result and result.book_id not in seen_ids:
+                    seen_ids.add(result.book_id)
+                    results.append(result)
+                    if len(results) == top_k:
+                        break
+            
+            return results if results else self._fallback_results(candidates, top_k)
+            
+        except Exception as e:
+            logger.warning("rerank error: %s", e)
+            return self._fallback_results(candidates, top_k)
+
+    async def rerank_stream(
+        self,
+        candidates: List[RecommendationCandidate],
+        user_context: Dict[str, Any],
+        top_k: Optional[int] = None
+    ) -> AsyncIterator[RecommendationResult]:
+        """
+        Streaming variant of rerank().
+        
+        Uses Gemini's streaming API and yields each result as soon as its
+        JSON object has fully arrived, instead of waiting for the whole
+        array. Falls back to description-based results if nothing streams.
+        """
+        top_k = top_k or self._settings.top_k_results
+        
+        if not candidates:
+            return
+        
+        if not await self._initialize_client():
+            for result in self._fallback_results(candidates, top_k):
+                yield result
+            return
+        
+        candidates = candidates[:min(len(candidates), 15)]
+        prompt = self._build_rerank_prompt(candidates, user_context, top_k)
+        
+        seen_ids = set()
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def read_stream():
+            # Holds an LLM slot only while reading from Gemini; results go
+            # through the queue so a slow SSE client can't pin the slot
+            try:
+                async with get_gemini_semaphore():
+                    response = await self._client.generate_content_async(prompt, stream=True)
+                    scanner = _JsonObjectScanner()
+                    async for chunk in response:
+                        for item in scanner.feed(chunk.text):
+                            result = self._result_from_item(item, candidates, len(seen_ids) + 1)
+                            if result and result.book_id not in seen_ids:
+                                seen_ids.add(result.book_id)
+                                results.put_nowait(result)
+                                # Got top_k results: drop the rest of the stream
+                                if len(seen_ids) >= top_k:
+                                    return
+            except Exception as e:
+                logger.warning("rerank_stream error: %s", e)
+            finally:
+                results.put_nowait(None)
         
+        reader = asyncio.create_task(read_stream())
+        try:
+            while (result := await results.get()) is not None:
+                yield result
+        finally:
+            # Consumer gone (e.g. client disconnected): stop reading
+            reader.cancel()
+        
+        if not seen_ids:
+            for result in self._fallback_results(candidates, top_k):
+                yield result
+
+    def _build_rerank_prompt(
+        self,
+        candidates: List[RecommendationCandidate],
+        user_context: Dict[str, Any],
+        top_k: int
+    ) -> str:
+        """Build the voice-only narration prompt shared by rerank variants."""
         personality = user_context.get("personality", "friendly")
         user_name = user_context.get("user_name", "friend")
         mood = user_context.get("emotional_context", "neutral")
@@ -330,41 +508,30 @@ HARD RULES:
 
 OUTPUT (strict JSON array):
 [{{"book_index":1,"explanation":"Your personalized reason..."}}]"""
+        return prompt
 
-        try:
-            response = await self._client.generate_content_async(prompt)
-            text = response.text.strip()
-            
-            # Clean JSON
-            if "```json" in text:
-                text = text.split("```json")[1].split("```")[0]
-            elif "```" in text:
-                text = text.split("```")[1].split("```")[0]
-            
-            parsed = json.loads(text.strip())
-            
-            results = []
-            for rank, item in enumerate(parsed[:top_k], start=1):
-                idx = item.get("book_index", rank) - 1
-                if 0 <= idx < len(candidates):
-                    book = candidates[idx].book
-                    results.append(RecommendationResult(
-                        book_id=book.id,
-                        title=book.title,
-                        author=book.author,
-                        description=book.description,
-                        genre=book.genre,
-                        rating=book.rating,
-                        cover_url=book.cover_url,
-                        explanation=item.get("explanation", ""),
-                        rank=rank
-                    ))
-            
-            return results if results else self._fallback_results(candidates, top_k)
-            
-        except Exception as e:
-            print(f"[rerank] Error: {e}")
-            return self._fallback_results(candidates, top_k)
+    def _result_from_item(
+        self,
+        item: Dict[str, Any],
+        candidates: List[RecommendationCandidate],
+        rank: int
+    ) -> Optional[RecommendationResult]:
+        """Map one {"book_index", "explanation"} item to a result (None if out of range)."""
+        idx = item.get("book_index", rank) - 1
+        if not 0 <= idx < len(candidates):
+            return None
+        book = candidates[idx].book
+        return RecommendationResult(
+            book_id=book.id,
+            title=book.title,
+            author=book.author,
+            description=book.description,
+            genre=book.genre,
+            rating=book.rating,
+            cover_url=book.cover_url,
+            explanation=item.get("explanation", ""),
+            rank=rank
+        )
 
     async def generate_from_knowledge(
         self,
@@ -395,12 +562,53 @@ FORMAT: Natural, conversational response in your persona.
 - Do NOT apologize for the empty database."""
 
         try:
-            response = await self._client.generate_content_async(prompt)
+            response = await generate_content(self._client, prompt)
             return response.text.strip()
         except Exception as e:
-            print(f"[generate_from_knowledge] Error: {e}")
+            logger.warning("generate_from_knowledge error: %s", e)
             return "Let me think... could you tell me a bit more about what you're in the mood for?"
 
+    async def summarize_history(
+        self,
+        previous_summary: str,
+        messages: List[Dict[str, str]]
+    ) -> Optional[str]:
+        """
+        Fold older chat messages into the rolling conversation summary.
+        
+        Returns the new summary (a few sentences), or None if the LLM is
+        unavailable or fails.
+        """
+        if not messages or not await self._initialize_client():
+            return None
+        
+        transcript = "\n".join(
+            f"{msg.get('role', 'user').upper()}: {msg.get('content', msg.get('message', ''))[:300]}"
+            for msg in messages
+        )
+        
+        prompt = f"""Update a running summary of a book-recommendation chat.
+
+PREVIOUS SUMMARY:
+{previous_summary or "(none)"}
+
+NEW MESSAGES:
+{transcript}
+
+TASK: Rewrite the summary to include the new messages, under 120 words.
+Keep reading preferences, books mentioned or disliked, and open requests.
+Plain text only."""
+
+        try:
+            response = await generate_content(
+                self._client, prompt,
+                generation_config={"max_output_tokens": 200, "temperature": 0.3}
+            )
+            return response.text.strip() or None
+        except Exception as e:
+            logger.warning("summarize_history error: %s", e)
+            return None
+
     def _fallback_results(
         self,
         candidates: List[RecommendationCandidate],
@@ -426,6 +634,13 @@ FORMAT: Natural, conversational response in your persona.
         return results
 
 
+# Singleton instance: the Gemini client is configured once, not per request
+_reranking_service: Optional[RerankingService] = None
+
+
 def get_reranking_service() -> RerankingService:
-    """Factory function for dependency injection."""
-    return RerankingService()
+    """Factory function for dependency injection (shared instance)."""
+    global _reranking_service
+    if _reranking_service is None:
+        _reranking_service = RerankingService()
+    return _reranking_service
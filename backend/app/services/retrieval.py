@@ -44,7 +44,7 @@ class RetrievalService:
         
         Flow:
         1. Perform vector similarity search
-        2. Apply metadata filters
+        2. Drop duplicate books, apply metadata filters
         3. Combine scores
         4. Return ranked candidates
         
@@ -68,11 +68,17 @@ class RetrievalService:
         
         # Step 2: Convert to candidates and apply filters
         candidates: List[RecommendationCandidate] = []
+        seen_ids = set()
         
         for result in search_results:
             book = result["book"]
             similarity_score = result["score"]
             
+            # Skip duplicate entries for the same book (e.g. re-added JIT
+            # books) so the reranker never pays tokens for them
+            if book.id in seen_ids:
+                continue
+            
             # Skip if below similarity threshold
             if similarity_score < self._settings.min_similarity_score:
                 continue
@@ -95,6 +101,7 @@ class RetrievalService:
                 combined_score=combined_score
             )
             candidates.append(candidate)
+            seen_ids.add(book.id)
             
             # Stop once we have enough candidates
             if len(candidates) >= top_k:
@@ -160,12 +167,20 @@ class RetrievalService:
         return (0.6 * rating_score) + (0.4 * popularity)
 
 
+# Singleton instance (stateless apart from settings)
+_retrieval_service: Optional[RetrievalService] = None
+
+
 # Dependency injection function for FastAPI
 def get_retrieval_service() -> RetrievalService:
     """
     Factory function for dependency injection.
     
     Using a function rather than a class instance allows for
-    easier testing and configuration.
+    easier testing and configuration (override it via
+    app.dependency_overrides). Returns one shared instance.
     """
-    return RetrievalService()
+    global _retrieval_service
+    if _retrieval_service is None:
+        _retrieval_service = RetrievalService()
+    return _retrieval_service
@@ -0,0 +1,92 @@
+"""
+Anonymous Session Store
+
+Short chat histories for users who aren't logged in, keyed by session ID.
+
+- With REDIS_URL set, histories live in Redis lists (shared by every
+  worker process, survive restarts, expire after inactivity).
+- Otherwise they stay in a per-process TTL cache, which is fine for a
+  single worker but not shared across `--workers N`.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional
+
+import orjson
+from cachetools import TTLCache
+
+from app.config import get_settings
+
+
+# Messages kept per anonymous session
+SESSION_HISTORY_MESSAGES = 20
+
+
+class SessionStore:
+    """In-process anonymous session histories (bounded, idle sessions expire)."""
+
+    def __init__(self, ttl_seconds: int, max_sessions: int = 10_000):
+        self._sessions: TTLCache = TTLCache(maxsize=max_sessions, ttl=ttl_seconds)
+
+    async def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        """Return the session's recent messages, oldest first."""
+        return list(self._sessions.get(session_id, ()))
+
+    async def append(self, session_id: str, message: Dict[str, str]) -> None:
+        """Append a message, dropping the oldest past the history limit."""
+        history = self._sessions.get(session_id)
+        if history is None:
+            history = deque(maxlen=SESSION_HISTORY_MESSAGES)
+        history.append(message)
+        # Re-set so the session's idle timer restarts
+        self._sessions[session_id] = history
+
+    async def close(self) -> None:
+        """Nothing to release for the in-process store."""
+
+
+class RedisSessionStore(SessionStore):
+    """Anonymous session histories in Redis lists, shared across workers."""
+
+    def __init__(self, redis_url: str, ttl_seconds: int):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(redis_url)
+        self._ttl = ttl_seconds
+
+    def _key(self, session_id: str) -> str:
+        return f"anon:{session_id}"
+
+    async def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        """Return the session's recent messages, oldest first."""
+        raw = await self._redis.lrange(self._key(session_id), -SESSION_HISTORY_MESSAGES, -1)
+        return [orjson.loads(item) for item in raw]
+
+    async def append(self, session_id: str, message: Dict[str, str]) -> None:
+        """Append a message, trim to the history limit and refresh the TTL."""
+        key = self._key(session_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(key, orjson.dumps(message))
+            pipe.ltrim(key, -SESSION_HISTORY_MESSAGES, -1)
+            pipe.expire(key, self._ttl)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        """Close the Redis connection pool."""
+        await self._redis.aclose()
+
+
+# Singleton instance
+_session_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    """Get the singleton session store (Redis if configured)."""
+    global _session_store
+    if _session_store is None:
+        settings = get_settings()
+        if settings.redis_url:
+            _session_store = RedisSessionStore(settings.redis_url, settings.session_ttl_seconds)
+        else:
+            _session_store = SessionStore(settings.session_ttl_seconds)
+    return _session_store